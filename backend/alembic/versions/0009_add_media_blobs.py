@@ -0,0 +1,40 @@
+"""Add media_blobs table for content-addressed media storage
+
+Revision ID: 0009_add_media_blobs
+Revises: 0008_add_video_reactions
+Create Date: 2026-10-16
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0009_add_media_blobs"
+down_revision = "0008_add_video_reactions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_blobs",
+        sa.Column("path", sa.String(length=500),
+                  primary_key=True, nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(),
+                  nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True),
+                  nullable=False, server_default=sa.text("now()")),
+        sa.Column("updated_at", sa.DateTime(timezone=True),
+                  nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_index("ix_media_blobs_ref_count_updated_at",
+                    "media_blobs", ["ref_count", "updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_blobs_ref_count_updated_at", table_name="media_blobs")
+    op.drop_table("media_blobs")
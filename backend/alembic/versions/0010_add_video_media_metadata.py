@@ -0,0 +1,36 @@
+"""Add probed media metadata and keyframe index to videos
+
+Revision ID: 0010_video_media_metadata
+Revises: 0009_add_media_blobs
+Create Date: 2026-10-16
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0010_video_media_metadata"
+down_revision = "0009_add_media_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("videos", sa.Column("duration_seconds", sa.Float(), nullable=True))
+    op.add_column("videos", sa.Column("width", sa.Integer(), nullable=True))
+    op.add_column("videos", sa.Column("height", sa.Integer(), nullable=True))
+    op.add_column("videos", sa.Column("video_codec", sa.String(length=32), nullable=True))
+    op.add_column("videos", sa.Column("audio_codec", sa.String(length=32), nullable=True))
+    op.add_column("videos", sa.Column("keyframe_index", postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("videos", "keyframe_index")
+    op.drop_column("videos", "audio_codec")
+    op.drop_column("videos", "video_codec")
+    op.drop_column("videos", "height")
+    op.drop_column("videos", "width")
+    op.drop_column("videos", "duration_seconds")
@@ -0,0 +1,25 @@
+"""Add HLS playlist URL to videos
+
+Revision ID: 0011_video_hls_url
+Revises: 0010_video_media_metadata
+Create Date: 2026-10-16
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0011_video_hls_url"
+down_revision = "0010_video_media_metadata"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("videos", sa.Column("hls_url", sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("videos", "hls_url")
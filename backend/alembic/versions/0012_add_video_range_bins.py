@@ -0,0 +1,34 @@
+"""Add video_range_bins table for range-request telemetry
+
+Revision ID: 0012_add_video_range_bins
+Revises: 0011_video_hls_url
+Create Date: 2026-10-16
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0012_add_video_range_bins"
+down_revision = "0011_video_hls_url"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "video_range_bins",
+        sa.Column("video_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("bin", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("hits", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True),
+                  nullable=False, server_default=sa.text("now()")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("video_range_bins")
@@ -5,15 +5,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.errors import AuthRequired
 from app.db.database import get_db_session
+from app.middleware.auth import load_session_user
 from app.models.user import User
 
 
-def get_request_user(request: Request) -> User | None:
-    return getattr(request.state, "user", None)
+async def get_request_user(request: Request) -> User | None:
+    """The signed-in user, loaded on first call and memoized for the rest of the request."""
+    state = request.state
+    if not hasattr(state, "user"):
+        cookies = getattr(state, "auth", None)
+        loaded = await load_session_user(cookies) if cookies is not None else None
+        state.user, state.session_id = loaded if loaded is not None else (None, None)
+        state.user_id = state.user.id if state.user is not None else None
+    return state.user
 
 
 async def require_user(request: Request) -> User:
-    user = get_request_user(request)
+    user = await get_request_user(request)
     if user is None:
         raise AuthRequired()
     return user
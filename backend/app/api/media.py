@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import time
 import uuid
 
+from starlette.datastructures import MutableHeaders, QueryParams
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.errors import Forbidden
+from app.core.file_io import run_io
+from app.core.security import SIGNED_MEDIA_KINDS, verify_media_signature
 from app.models.user import User
 
 
@@ -10,24 +19,222 @@ def _media_root() -> str:
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "media"))
 
 
-def _find_user_media(user_id: uuid.UUID, folder: str) -> str:
+def resolve_media_path(url: str) -> str | None:
+    if not url or not url.startswith("/media/"):
+        return None
     root = _media_root()
-    candidates = [".png", ".jpg", ".jpeg", ".webp"]
-    for ext in candidates:
-        filename = f"{user_id}{ext}"
-        path = os.path.join(root, folder, filename)
-        if os.path.exists(path):
-            return f"/media/{folder}/{filename}"
-    return ""
+    path = os.path.abspath(os.path.join(root, url[len("/media/"):]))
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+# Content-addressed (or derived from content-addressed) files never change in place.
+IMMUTABLE_MEDIA_KINDS = ("videos", "thumbnails", "hls")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def media_cache_control(kind: str, query: QueryParams) -> str:
+    """Fingerprinted files are cached for a year; anything else must revalidate."""
+    return IMMUTABLE_CACHE_CONTROL if kind in IMMUTABLE_MEDIA_KINDS or "v" in query else "no-cache"
+
+
+class MediaCacheHeaders:
+    """Adds ``Cache-Control`` to ``/media`` responses.
+
+    Fingerprinted files (blob paths, or any URL with a ``?v=`` version) are
+    cached for a year; unversioned URLs must be revalidated, which the
+    ETag/Last-Modified validators from ``StaticFiles`` turn into cheap 304s.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        kind = scope["path"][len("/media/"):].split("/", 1)[0]
+        cache_control = media_cache_control(kind, QueryParams(scope.get("query_string", b"")))
+
+        async def send_with_cache_control(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] in (200, 206, 304):
+                MutableHeaders(scope=message).setdefault("Cache-Control", cache_control)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_control)
+
+
+class SignedMediaGuard:
+    """Wraps the ``/media`` app so videos, thumbnails and HLS need a valid signed URL.
+
+    Checking the HMAC needs no database access. Responses may be cached by
+    shared caches until the URL expires, but no longer. HLS playlists are
+    served from here with the playlist's ``exp``/``sig`` appended to each
+    segment URI, since players resolve segments without the query string.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if path[len("/media/"):].split("/", 1)[0] not in SIGNED_MEDIA_KINDS:
+            await self.app(scope, receive, send)
+            return
+
+        params = QueryParams(scope.get("query_string", b""))
+        expires = params.get("exp")
+        if not verify_media_signature(path, expires, params.get("sig")):
+            raise Forbidden("Invalid or expired media URL")
+
+        max_age = max(int(expires) - int(time.time()), 0)
+        cache_control = f"public, max-age={max_age}, immutable"
+        if path.endswith(".m3u8"):
+            playlist = await signed_playlist(path, scope.get("query_string", b"").decode("latin-1"))
+            if playlist is None:
+                await self.app(scope, receive, send)
+                return
+            response = Response(playlist, media_type="application/vnd.apple.mpegurl",
+                                headers={"Cache-Control": cache_control})
+            await response(scope, receive, send)
+            return
+
+        async def send_with_cache_control(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["Cache-Control"] = cache_control
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_control)
+
+
+async def signed_playlist(path: str, query: str) -> str | None:
+    """The playlist at ``path`` with ``query`` appended to each segment URI, or None if missing."""
+    file_path = resolve_media_path(path)
+    if file_path is None:
+        return None
+    try:
+        text = await run_io(_read_text, file_path)
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    lines = [
+        line if not line or line.startswith("#") else f"{line}?{query}"
+        for line in text.splitlines()
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _read_text(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+USER_MEDIA_FOLDERS = ("avatars", "banners")
+_USER_MEDIA_EXTS = [".png", ".jpg", ".jpeg", ".webp"]
+
+
+def media_version(stat: os.stat_result) -> str:
+    """Version tag for files that are overwritten in place (avatars, banners)."""
+    return f"{stat.st_mtime_ns:x}"
+
+
+class UserMediaIndex:
+    """Map of user id to avatar/banner filename, built from a directory scan.
+
+    Upload and delete handlers keep it current through ``record``/``rescan_user``,
+    so finding a user's file is a dict lookup instead of stat calls. The index
+    is per worker, so it never supplies the ``?v=`` version: that is stored
+    with the user row when the file is uploaded.
+    """
+
+    def __init__(self) -> None:
+        self._files: dict[str, dict[uuid.UUID, str]] = {folder: {} for folder in USER_MEDIA_FOLDERS}
+        self._built = False
+
+    def rebuild(self) -> None:
+        root = _media_root()
+        files: dict[str, dict[uuid.UUID, str]] = {}
+        for folder in USER_MEDIA_FOLDERS:
+            found: dict[uuid.UUID, str] = {}
+            try:
+                names = os.listdir(os.path.join(root, folder))
+            except FileNotFoundError:
+                names = []
+            for name in names:
+                stem, ext = os.path.splitext(name)
+                if ext not in _USER_MEDIA_EXTS:
+                    continue
+                try:
+                    user_id = uuid.UUID(stem)
+                except ValueError:
+                    continue
+                current = found.get(user_id)
+                if current is None or _USER_MEDIA_EXTS.index(ext) < _USER_MEDIA_EXTS.index(os.path.splitext(current)[1]):
+                    found[user_id] = name
+            files[folder] = found
+        self._files = files
+        self._built = True
+
+    def lookup(self, user_id: uuid.UUID, folder: str) -> str:
+        if not self._built:
+            self.rebuild()
+        filename = self._files[folder].get(user_id)
+        return f"/media/{folder}/{filename}" if filename else ""
+
+    def record(self, folder: str, user_id: uuid.UUID, filename: str) -> None:
+        self._files[folder][user_id] = filename
+
+    def rescan_user(self, folder: str, user_id: uuid.UUID) -> None:
+        """Re-read one user's files in ``folder``, e.g. after one of them was deleted.
+
+        Picks the same file a full ``rebuild`` would, so a remaining file with
+        another extension stays visible.
+        """
+        directory = os.path.join(_media_root(), folder)
+        for ext in _USER_MEDIA_EXTS:
+            name = f"{user_id}{ext}"
+            if os.path.isfile(os.path.join(directory, name)):
+                self._files[folder][user_id] = name
+                return
+        self._files[folder].pop(user_id, None)
+
+
+user_media_index = UserMediaIndex()
+
+
+def remove_other_user_media(folder: str, user_id: uuid.UUID, keep: str) -> list[str]:
+    """Delete ``user_id``'s files in ``folder`` other than ``keep`` and return their URLs.
+
+    An upload with a new extension would otherwise leave the old file behind,
+    and a rescan, which prefers extensions in ``_USER_MEDIA_EXTS`` order,
+    could bring it back.
+    """
+    directory = os.path.join(_media_root(), folder)
+    removed: list[str] = []
+    for ext in _USER_MEDIA_EXTS:
+        name = f"{user_id}{ext}"
+        if name == keep:
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        removed.append(f"/media/{folder}/{name}")
+    return removed
+
+
+async def rescan_user_media(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await run_io(user_media_index.rebuild)
 
 
 def resolve_user_avatar(user: User) -> str:
-    if user.avatar_url:
-        return user.avatar_url
-    return _find_user_media(user.id, "avatars")
+    return user.avatar_url or user_media_index.lookup(user.id, "avatars")
 
 
 def resolve_user_banner(user: User) -> str:
-    if user.banner_url:
-        return user.banner_url
-    return _find_user_media(user.id, "banners")
+    return user.banner_url or user_media_index.lookup(user.id, "banners")
@@ -12,8 +12,14 @@ from fastapi.responses import RedirectResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import db_session_dep
-from app.api.media import resolve_user_avatar, resolve_user_banner
+from app.api.deps import db_session_dep, get_request_user
+from app.api.media import (
+    media_version,
+    remove_other_user_media,
+    resolve_user_avatar,
+    resolve_user_banner,
+    user_media_index,
+)
 from app.core.config import get_settings
 from app.core.cookies import clear_auth_cookies, normalize_samesite, set_auth_cookies
 from app.core.errors import AuthInvalid
@@ -22,6 +28,7 @@ from app.models.session import Session
 from app.models.user import User
 from app.schemas.v1 import V1User
 from app.services.auth_service import AuthService
+from app.services.image_variants import remove_variants, srcset
 
 router = APIRouter()
 
@@ -38,7 +45,9 @@ def _to_v1_user(user: User, subscribers: int = 0) -> V1User:
         id=str(user.id),
         username=user.username,
         avatar=resolve_user_avatar(user) or "",
+        avatarSrcset=srcset(resolve_user_avatar(user)),
         banner=resolve_user_banner(user) or "",
+        bannerSrcset=srcset(resolve_user_banner(user)),
         subscribers=subscribers,
     )
 
@@ -194,7 +203,10 @@ async def google_callback(
                 avatar_path = os.path.join(avatar_dir, filename)
                 with open(avatar_path, "wb") as f:
                     f.write(pic_resp.content)
-                user.avatar_url = f"/media/avatars/{filename}"
+                for stale_url in remove_other_user_media("avatars", user.id, filename):
+                    await remove_variants(stale_url)
+                user_media_index.record("avatars", user.id, filename)
+                user.avatar_url = f"/media/avatars/{filename}?v={media_version(os.stat(avatar_path))}"
                 await db.flush()
             else:
                 logger.warning("Google avatar download failed status=%s", pic_resp.status_code)
@@ -276,7 +288,7 @@ async def register(
 
 @router.get("/users/me", status_code=status.HTTP_200_OK)
 async def users_me(request: Request) -> dict:
-    user = getattr(request.state, "user", None)
+    user = await get_request_user(request)
     if user is None:
         raise AuthInvalid("Not authenticated")
     return _to_v1_user(user).model_dump()
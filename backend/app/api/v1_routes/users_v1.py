@@ -2,17 +2,28 @@ from __future__ import annotations
 
 import uuid
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Form, HTTPException, status
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 import os
 
 from app.api.deps import db_session_dep, require_user
-from app.api.media import resolve_user_avatar, resolve_user_banner
+from app.api.media import (
+    media_version,
+    remove_other_user_media,
+    resolve_user_avatar,
+    resolve_user_banner,
+    user_media_index,
+)
+from app.core.config import get_settings
+from app.core.file_io import run_io
+from app.core.uploads import save_upload
 from app.models.subscription import Subscription
 from app.models.user import User
 from app.schemas.v1 import V1User
+from app.services.image_variants import generate_variants, remove_variants, srcset
+from app.services.session_cache import get_session_cache
 
 router = APIRouter()
 
@@ -28,7 +39,9 @@ async def list_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends
     for user in users:
         subs = await db.scalar(select(func.count()).select_from(Subscription).where(Subscription.channel_id == user.id))
         result.append(V1User(id=str(user.id), username=user.username,
-                      avatar=resolve_user_avatar(user) or "", banner=resolve_user_banner(user) or "", subscribers=int(subs or 0)))
+                      avatar=resolve_user_avatar(user) or "",
+                      avatarSrcset=srcset(resolve_user_avatar(user)), banner=resolve_user_banner(user) or "",
+                      bannerSrcset=srcset(resolve_user_banner(user)), subscribers=int(subs or 0)))
 
     return result
 
@@ -58,8 +71,10 @@ async def search_users(q: str = "", skip: int = 0, limit: int = 50, db: AsyncSes
             V1User(
                 id=str(user.id),
                 username=user.username,
-                avatar=user.avatar_url or "",
-                banner=getattr(user, "banner_url", "") or "",
+                avatar=resolve_user_avatar(user) or "",
+                avatarSrcset=srcset(resolve_user_avatar(user)),
+                banner=resolve_user_banner(user) or "",
+                bannerSrcset=srcset(resolve_user_banner(user)),
                 subscribers=int(subs or 0),
             )
         )
@@ -73,11 +88,14 @@ async def get_user(id: str, db: AsyncSession = Depends(db_session_dep)) -> V1Use
     if user is None:
         return V1User(id=id, username="unknown", avatar="", banner="", subscribers=0)
     subs = await db.scalar(select(func.count()).select_from(Subscription).where(Subscription.channel_id == user.id))
-    return V1User(id=str(user.id), username=user.username, avatar=resolve_user_avatar(user) or "", banner=resolve_user_banner(user) or "", subscribers=int(subs or 0))
+    return V1User(id=str(user.id), username=user.username, avatar=resolve_user_avatar(user) or "",
+                  avatarSrcset=srcset(resolve_user_avatar(user)), banner=resolve_user_banner(user) or "",
+                  bannerSrcset=srcset(resolve_user_banner(user)), subscribers=int(subs or 0))
 
 
 @router.post("/me/avatar", status_code=200)
 async def upload_avatar(
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(db_session_dep),
     avatar: UploadFile = File(...),
     current_user: User = Depends(require_user),
@@ -86,13 +104,18 @@ async def upload_avatar(
     filename = f"{current_user.id}{ext}"
     avatar_dir = os.path.abspath(os.path.join(
         os.path.dirname(__file__), '../../../media/avatars'))
-    os.makedirs(avatar_dir, exist_ok=True)
     avatar_path = os.path.join(avatar_dir, filename)
-    with open(avatar_path, "wb") as f:
-        f.write(await avatar.read())
-    current_user.avatar_url = f"/media/avatars/{filename}"
+    await save_upload(avatar, avatar_path, get_settings().max_image_upload_bytes)
+    for stale_url in await run_io(remove_other_user_media, "avatars", current_user.id, filename):
+        await remove_variants(stale_url)
+    user_media_index.record("avatars", current_user.id, filename)
+    # The version lives in the stored URL so every worker serves the same one.
+    version = media_version(await run_io(os.stat, avatar_path))
+    current_user.avatar_url = f"/media/avatars/{filename}?v={version}"
     await db.commit()
-    return {"avatar": current_user.avatar_url}
+    get_session_cache().invalidate_user(current_user.id)
+    background_tasks.add_task(generate_variants, current_user.avatar_url)
+    return {"avatar": resolve_user_avatar(current_user)}
 
 
 @router.delete("/me/avatar", status_code=204)
@@ -102,16 +125,20 @@ async def delete_avatar(
 ):
     if current_user.avatar_url:
         avatar_path = os.path.abspath(os.path.join(os.path.dirname(
-            __file__), f"../../../{current_user.avatar_url.lstrip('/')}"))
+            __file__), f"../../../{current_user.avatar_url.partition('?')[0].lstrip('/')}"))
         if os.path.exists(avatar_path):
             os.remove(avatar_path)
+        await run_io(user_media_index.rescan_user, "avatars", current_user.id)
+        await remove_variants(current_user.avatar_url)
         current_user.avatar_url = ""
         await db.commit()
+        get_session_cache().invalidate_user(current_user.id)
     return {}
 
 
 @router.post("/me/banner", status_code=200)
 async def upload_banner(
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(db_session_dep),
     banner: UploadFile = File(...),
     current_user: User = Depends(require_user),
@@ -120,13 +147,18 @@ async def upload_banner(
     filename = f"{current_user.id}{ext}"
     banner_dir = os.path.abspath(os.path.join(
         os.path.dirname(__file__), '../../../media/banners'))
-    os.makedirs(banner_dir, exist_ok=True)
     banner_path = os.path.join(banner_dir, filename)
-    with open(banner_path, "wb") as f:
-        f.write(await banner.read())
-    current_user.banner_url = f"/media/banners/{filename}"
+    await save_upload(banner, banner_path, get_settings().max_image_upload_bytes)
+    for stale_url in await run_io(remove_other_user_media, "banners", current_user.id, filename):
+        await remove_variants(stale_url)
+    user_media_index.record("banners", current_user.id, filename)
+    # The version lives in the stored URL so every worker serves the same one.
+    version = media_version(await run_io(os.stat, banner_path))
+    current_user.banner_url = f"/media/banners/{filename}?v={version}"
     await db.commit()
-    return {"banner": current_user.banner_url}
+    get_session_cache().invalidate_user(current_user.id)
+    background_tasks.add_task(generate_variants, current_user.banner_url)
+    return {"banner": resolve_user_banner(current_user)}
 
 
 @router.delete("/me/banner", status_code=204)
@@ -136,9 +168,12 @@ async def delete_banner(
 ):
     if getattr(current_user, 'banner_url', None):
         banner_path = os.path.abspath(os.path.join(os.path.dirname(
-            __file__), f"../../../{current_user.banner_url.lstrip('/')}"))
+            __file__), f"../../../{current_user.banner_url.partition('?')[0].lstrip('/')}"))
         if os.path.exists(banner_path):
             os.remove(banner_path)
+        await run_io(user_media_index.rescan_user, "banners", current_user.id)
+        await remove_variants(current_user.banner_url)
         current_user.banner_url = None
         await db.commit()
+        get_session_cache().invalidate_user(current_user.id)
     return {}
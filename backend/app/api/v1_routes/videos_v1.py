@@ -5,26 +5,46 @@ from datetime import datetime
 import os
 from fastapi.responses import FileResponse
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile, status, Request
-from sqlalchemy import delete, select, update, or_
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Response, UploadFile, status, Request
+from sqlalchemy import delete, null, select, update, or_
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 
 from app.api.deps import db_session_dep, require_user, get_request_user
-from app.api.media import resolve_user_avatar
+from app.api.media import resolve_media_path, resolve_user_avatar
+from app.core.config import get_settings
+from app.core.egress import get_egress_scheduler
+from app.core.errors import Conflict, Forbidden
+from app.core.file_table import get_file_table
+from app.core.mp4 import keyframe_offset, seconds_at_offset
+from app.core.offload import offload_mode, offload_response
+from app.core.security import sign_media_url, verify_media_signature
+from app.core.range_telemetry import get_range_telemetry
+from app.core.streaming import RangeNotSatisfiable, StreamingResponseWithRange, parse_range_header
 from app.models.subscription import Subscription
 from app.models.user import User
 from app.models.video import Video
 from app.models.video_view import VideoView
 from app.models.video_reaction import VideoReaction
-from app.schemas.v1 import V1User, V1Video
+from app.schemas.v1 import V1Heatmap, V1HeatmapBin, V1User, V1Video
+from app.services.blob_store import BlobStore
+from app.services.image_variants import generate_variants, srcset
+from app.services.media_pipeline import process_video
+from app.services.retention import RetentionService
+from app.services.upload_service import UploadService
 
 router = APIRouter()
 
+# Players abort most whole-file and open-ended requests early, so offloaded
+# responses are counted for at most this many bytes from their start.
+OFFLOAD_RECORD_BYTES = 8 * 1024 * 1024
+
 
 def _to_v1_user(user: User, subscribers: int) -> V1User:
-    return V1User(id=str(user.id), username=user.username, avatar=resolve_user_avatar(user) or "", subscribers=subscribers)
+    avatar = resolve_user_avatar(user) or ""
+    return V1User(id=str(user.id), username=user.username, avatar=avatar, avatarSrcset=srcset(avatar),
+                  subscribers=subscribers)
 
 
 def _to_v1_video(video: Video, uploader: User, subscribers: int, viewer_reaction: str | None = None) -> V1Video:
@@ -34,13 +54,20 @@ def _to_v1_video(video: Video, uploader: User, subscribers: int, viewer_reaction
         id=str(video.id),
         title=video.title,
         description=video.description,
-        thumbnail=video.thumbnail_url,
-        url=video.video_url,
+        thumbnail=sign_media_url(video.thumbnail_url),
+        thumbnailSrcset=srcset(video.thumbnail_url),
+        url=sign_media_url(video.video_url),
+        streamUrl=(sign_media_url(f"/api/v1/videos/{video.id}/stream")
+                   if video.video_url.startswith("/media/") else None),
         views=video.views_count,
         likes=video.likes_count,
         dislikes=video.dislikes_count,
         uploadedAt=uploaded_at,
         duration=video.duration,
+        durationSeconds=video.duration_seconds,
+        width=video.width,
+        height=video.height,
+        hlsUrl=sign_media_url(video.hls_url) if video.hls_url else video.hls_url,
         uploader=_to_v1_user(uploader, subscribers),
         tags=video.tags or [],
         viewerReaction=viewer_reaction,
@@ -178,7 +205,7 @@ async def get_video(id: str, request: Request, db: AsyncSession = Depends(db_ses
     subscribers = await db.scalar(select(func.count()).select_from(Subscription).where(Subscription.channel_id == uploader.id))
 
     viewer_reaction: str | None = None
-    current_user = get_request_user(request)
+    current_user = await get_request_user(request)
     if current_user is not None:
         reaction = await db.scalar(
             select(VideoReaction).where(VideoReaction.video_id == vid, VideoReaction.user_id == current_user.id)
@@ -195,8 +222,107 @@ async def get_video(id: str, request: Request, db: AsyncSession = Depends(db_ses
     ).model_copy(update={"likes": likes, "dislikes": dislikes})
 
 
+@router.api_route("/{id}/stream", methods=["GET", "HEAD"])
+async def stream_video(
+    id: str,
+    request: Request,
+    t: float | None = None,
+    db: AsyncSession = Depends(db_session_dep),
+) -> Response:
+    # Same check as /media/videos, so signing cannot be bypassed through this route.
+    if get_settings().media_signed_urls and not verify_media_signature(
+        request.url.path, request.query_params.get("exp"), request.query_params.get("sig")
+    ):
+        raise Forbidden("Invalid or expired media URL")
+    vid = uuid.UUID(id)
+    # The keyframe index is only needed (and only loaded) for ?t= seeks.
+    keyframe_column = Video.keyframe_index if t is not None else null().label("keyframe_index")
+    row = (
+        await db.execute(select(Video.video_url, Video.duration_seconds, keyframe_column).where(Video.id == vid))
+    ).first()
+    video_url, duration_seconds, keyframes = row if row is not None else (None, None, None)
+    # Release the pooled connection before the (possibly long) body is streamed.
+    await db.close()
+    file_path = resolve_media_path(video_url or "")
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    # ?t= only reports where the keyframe before t is stored; the response is
+    # the usual 200 or the client's Range, so the player (e.g. with HEAD)
+    # decides which bytes to request.
+    headers = {}
+    seek = keyframe_offset(keyframes, t) if keyframes and t is not None else None
+    if seek is not None:
+        headers = {"X-Keyframe-Time": f"{seek[0]:.3f}", "X-Keyframe-Offset": str(seek[1])}
+    offloaded = await _offload_video(
+        vid, video_url, file_path, duration_seconds, request.headers.get("range"), headers)
+    if offloaded is not None:
+        return offloaded
+    return StreamingResponseWithRange(
+        file_path, headers=headers, duration_seconds=duration_seconds, telemetry_id=vid)
+
+
+async def _offload_video(
+    vid: uuid.UUID,
+    video_url: str,
+    file_path: str,
+    duration_seconds: float | None,
+    range_header: str | None,
+    headers: dict[str, str],
+) -> Response | None:
+    """Hand the body to the fronting proxy when ``MEDIA_OFFLOAD`` is set."""
+    mode = offload_mode()
+    if mode is None:
+        return None
+    try:
+        meta = await get_file_table().stat(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Video not found")
+    # The proxy serves the bytes and does not report how many were sent, so
+    # the range is counted here from the request, up to OFFLOAD_RECORD_BYTES.
+    try:
+        ranges = parse_range_header(range_header, meta.size) if range_header else None
+    except RangeNotSatisfiable:
+        ranges = []
+    telemetry = get_range_telemetry()
+    for start, end in [(0, meta.size - 1)] if ranges is None else ranges:
+        telemetry.record(vid, file_path, start, min(end - start + 1, OFFLOAD_RECORD_BYTES))
+
+    headers = dict(headers)
+    cap = get_egress_scheduler().bitrate_cap(meta.size, duration_seconds)
+    if cap is not None and mode == "x-accel-redirect":
+        headers["X-Accel-Limit-Rate"] = str(int(cap))
+    return offload_response(video_url[len("/media/"):], file_path, headers=headers)
+
+
+@router.get("/{id}/heatmap", response_model=V1Heatmap)
+async def get_heatmap(id: str, db: AsyncSession = Depends(db_session_dep)) -> V1Heatmap:
+    """How often each byte range of the video was served, from range-request telemetry.
+
+    Bins are ``binBytes`` wide; ``startSeconds`` maps a bin to the keyframe
+    stored before it, so the player can draw the heatmap on its timeline.
+    """
+    vid = uuid.UUID(id)
+    keyframes = await db.scalar(select(Video.keyframe_index).where(Video.id == vid))
+    bin_bytes = get_settings().media_telemetry_bin_bytes
+    bins = await RetentionService.heatmap(db, vid)
+    return V1Heatmap(
+        videoId=id,
+        binBytes=bin_bytes,
+        bins=[
+            V1HeatmapBin(
+                offset=index * bin_bytes,
+                hits=hits,
+                startSeconds=seconds_at_offset(keyframes or [], index * bin_bytes),
+            )
+            for index, hits in bins
+        ],
+    )
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=V1Video)
 async def create_video(
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(db_session_dep),
     title: str = Form(""),
     description: str = Form(""),
@@ -211,30 +337,121 @@ async def create_video(
         raise RuntimeError("No users exist; register first")
 
     video_url = ""
-    thumbnail_url = ""
-    media_root = os.path.abspath(os.path.join(
-        os.path.dirname(__file__), '../../../media'))
-    videos_dir = os.path.join(media_root, 'videos')
-    thumbs_dir = os.path.join(media_root, 'thumbnails')
-    os.makedirs(videos_dir, exist_ok=True)
-    os.makedirs(thumbs_dir, exist_ok=True)
-
     if video:
-        ext = os.path.splitext(video.filename)[1]
-        video_filename = f"{uuid.uuid4().hex}{ext}"
-        video_path = os.path.join(videos_dir, video_filename)
-        with open(video_path, "wb") as f:
-            f.write(await video.read())
-        video_url = f"/media/videos/{video_filename}"
-
-    if thumbnail:
-        ext = os.path.splitext(thumbnail.filename)[1]
-        thumb_filename = f"{uuid.uuid4().hex}{ext}"
-        thumb_path = os.path.join(thumbs_dir, thumb_filename)
-        with open(thumb_path, "wb") as f:
-            f.write(await thumbnail.read())
-        thumbnail_url = f"/media/thumbnails/{thumb_filename}"
+        video_url = await BlobStore.store_upload(
+            db, video, kind="videos", max_bytes=get_settings().max_video_upload_bytes)
+
+    thumbnail_url = await _save_thumbnail(db, thumbnail)
+    return await _insert_video(
+        db,
+        background_tasks,
+        uploader,
+        title=title,
+        description=description,
+        duration=duration,
+        tags=tags,
+        thumbnail_url=thumbnail_url,
+        video_url=video_url,
+    )
+
+
+@router.post("/uploads", status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    response: Response,
+    length: int = Form(...),
+    filename: str = Form(""),
+    current_user: User = Depends(require_user),
+) -> dict:
+    session = await UploadService.create(user_id=current_user.id, length=length, filename=filename)
+    response.headers["Location"] = f"/api/v1/videos/uploads/{session.id}"
+    response.headers["Upload-Offset"] = "0"
+    response.headers["Upload-Length"] = str(session.length)
+    return {"id": session.id, "offset": session.offset, "length": session.length}
+
+
+@router.api_route("/uploads/{upload_id}", methods=["GET", "HEAD"])
+async def get_upload(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(require_user),
+) -> dict:
+    session = await UploadService.get(upload_id=upload_id, user_id=current_user.id)
+    response.headers["Upload-Offset"] = str(session.offset)
+    response.headers["Upload-Length"] = str(session.length)
+    response.headers["Cache-Control"] = "no-store"
+    return {"id": session.id, "offset": session.offset, "length": session.length}
+
+
+@router.patch("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    current_user: User = Depends(require_user),
+) -> Response:
+    session = await UploadService.get(upload_id=upload_id, user_id=current_user.id)
+    offset = request.headers.get("upload-offset", "")
+    if not offset.isdigit():
+        raise Conflict("Missing or invalid Upload-Offset header")
+    new_offset = await UploadService.append(session, offset=int(offset), chunks=request.stream())
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(new_offset)})
+
+
+@router.post("/uploads/{upload_id}/finalize", status_code=status.HTTP_201_CREATED, response_model=V1Video)
+async def finalize_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(db_session_dep),
+    title: str = Form(""),
+    description: str = Form(""),
+    duration: str = Form(""),
+    tags: str = Form(""),
+    thumbnail: UploadFile | None = File(default=None),
+    current_user: User = Depends(require_user),
+) -> V1Video:
+    session = await UploadService.get(upload_id=upload_id, user_id=current_user.id)
+    async with UploadService.complete(session) as data_path:
+        video_url = await BlobStore.store_file(db, data_path, kind="videos", filename=session.filename)
+
+    thumbnail_url = await _save_thumbnail(db, thumbnail)
+    return await _insert_video(
+        db,
+        background_tasks,
+        current_user,
+        title=title,
+        description=description,
+        duration=duration,
+        tags=tags,
+        thumbnail_url=thumbnail_url,
+        video_url=video_url,
+    )
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(upload_id: str, current_user: User = Depends(require_user)) -> Response:
+    session = await UploadService.get(upload_id=upload_id, user_id=current_user.id)
+    await UploadService.abort(session)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+
+async def _save_thumbnail(db: AsyncSession, thumbnail: UploadFile | None) -> str:
+    if not thumbnail:
+        return ""
+    return await BlobStore.store_upload(
+        db, thumbnail, kind="thumbnails", max_bytes=get_settings().max_image_upload_bytes)
+
+
+async def _insert_video(
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    uploader: User,
+    *,
+    title: str,
+    description: str,
+    duration: str,
+    tags: str,
+    thumbnail_url: str,
+    video_url: str,
+) -> V1Video:
     tag_list = [t.strip()
                 for t in tags.split(",") if t.strip()] if tags else []
 
@@ -248,8 +465,15 @@ async def create_video(
         tags=tag_list,
     )
     db.add(row)
+    await BlobStore.add_ref(db, video_url)
+    await BlobStore.add_ref(db, thumbnail_url)
     await db.commit()
     await db.refresh(row)
+    file_path = resolve_media_path(video_url)
+    if file_path is not None:
+        background_tasks.add_task(process_video, row.id, file_path)
+    if thumbnail_url:
+        background_tasks.add_task(generate_variants, thumbnail_url)
     return _to_v1_video(row, uploader, subscribers=0)
 
 
@@ -263,9 +487,13 @@ async def update_video(id: str, data: dict, db: AsyncSession = Depends(db_sessio
     for field in ["title", "description", "thumbnail", "url", "duration", "tags"]:
         if field in data:
             if field == "thumbnail":
+                await BlobStore.release(db, video.thumbnail_url)
                 video.thumbnail_url = str(data[field] or "")
+                await BlobStore.add_ref(db, video.thumbnail_url)
             elif field == "url":
+                await BlobStore.release(db, video.video_url)
                 video.video_url = str(data[field] or "")
+                await BlobStore.add_ref(db, video.video_url)
             elif field == "tags":
                 video.tags = data[field] or []
             else:
@@ -280,6 +508,10 @@ async def update_video(id: str, data: dict, db: AsyncSession = Depends(db_sessio
 @router.delete("/{id}", status_code=status.HTTP_200_OK)
 async def delete_video(id: str, db: AsyncSession = Depends(db_session_dep)) -> dict:
     vid = uuid.UUID(id)
+    video = await _get_video_or_none(db, vid)
+    if video is not None:
+        await BlobStore.release(db, video.video_url)
+        await BlobStore.release(db, video.thumbnail_url)
     await db.execute(delete(Video).where(Video.id == vid))
     await db.commit()
     return {"ok": True}
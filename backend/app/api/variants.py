@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, Response
+
+from app.api.media import media_cache_control, resolve_media_path
+from app.core.config import get_settings
+from app.core.errors import Forbidden, NotFound
+from app.core.file_io import run_io
+from app.core.images import VARIANT_FORMATS, VARIANT_WIDTHS, ImageError
+from app.core.offload import offload_response
+from app.core.security import SIGNED_MEDIA_KINDS, verify_media_signature
+from app.services.image_variants import VARIANTS_PREFIX, render_once
+
+router = APIRouter()
+
+_MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+def _is_fresh(dst_path: str, src_path: str) -> bool:
+    try:
+        return os.path.getmtime(dst_path) >= os.path.getmtime(src_path)
+    except FileNotFoundError:
+        return False
+
+
+@router.get("/media/variants/{folder}/{source:path}/{width:int}.{fmt}", include_in_schema=False)
+async def image_variant(folder: str, source: str, width: int, fmt: str, request: Request) -> Response:
+    """Serve a resized image, rendering and caching it on disk the first time it is asked for."""
+    if width not in VARIANT_WIDTHS.get(folder, ()) or fmt not in VARIANT_FORMATS:
+        raise NotFound("Unknown image variant")
+    # "avatars/../thumbnails/..." would otherwise skip the signature check
+    # below and render another folder's image at this folder's widths.
+    if any(part in ("", ".", "..") for part in source.split("/")):
+        raise NotFound("Image not found")
+    if get_settings().media_signed_urls and folder in SIGNED_MEDIA_KINDS:
+        params = request.query_params
+        if not verify_media_signature(request.url.path, params.get("exp"), params.get("sig")):
+            raise Forbidden("Invalid or expired media URL")
+
+    folder_path = resolve_media_path(f"/media/{folder}")
+    src_path = resolve_media_path(f"/media/{folder}/{source}")
+    relative = f"{folder}/{source}/{width}.{fmt}"
+    dst_path = resolve_media_path(f"{VARIANTS_PREFIX}{relative}")
+    if (
+        folder_path is None
+        or src_path is None
+        or dst_path is None
+        or os.path.commonpath([folder_path, src_path]) != folder_path
+        or not await run_io(os.path.isfile, src_path)
+    ):
+        raise NotFound("Image not found")
+
+    if not await run_io(_is_fresh, dst_path, src_path):
+        try:
+            await render_once(src_path, dst_path, width, fmt)
+        except (ImageError, OSError):
+            raise NotFound("Image variant unavailable")
+
+    headers = {"Cache-Control": media_cache_control(folder, request.query_params)}
+    offloaded = offload_response(f"variants/{relative}", dst_path, media_type=_MEDIA_TYPES[fmt], headers=headers)
+    if offloaded is not None:
+        return offloaded
+    return FileResponse(dst_path, media_type=_MEDIA_TYPES[fmt], headers=headers)
@@ -28,6 +28,17 @@ class Settings(BaseSettings):
         default=30 * 24 * 3600, alias="REFRESH_TOKEN_TTL_SECONDS")
     session_ttl_seconds: int = Field(
         default=30 * 24 * 3600, alias="SESSION_TTL_SECONDS")
+    argon2_time_cost: int = Field(default=3, alias="ARGON2_TIME_COST")
+    argon2_memory_cost_kib: int = Field(default=65536, alias="ARGON2_MEMORY_COST_KIB")
+    argon2_parallelism: int = Field(default=4, alias="ARGON2_PARALLELISM")
+    password_hash_workers: int = Field(default=2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_queue: int = Field(default=16, alias="PASSWORD_HASH_MAX_QUEUE")
+    session_last_seen_granularity_seconds: float = Field(
+        default=60, alias="SESSION_LAST_SEEN_GRANULARITY_SECONDS")
+    session_last_seen_flush_seconds: float = Field(default=10, alias="SESSION_LAST_SEEN_FLUSH_SECONDS")
+    auth_cache_ttl_seconds: float = Field(default=15, alias="AUTH_CACHE_TTL_SECONDS")
+    auth_cache_max_entries: int = Field(default=10000, alias="AUTH_CACHE_MAX_ENTRIES")
+    auth_stateless_access: bool = Field(default=False, alias="AUTH_STATELESS_ACCESS")
 
     cookie_secure: bool = Field(default=False, alias="COOKIE_SECURE")
     cookie_samesite: str = Field(default="lax", alias="COOKIE_SAMESITE")
@@ -42,6 +53,39 @@ class Settings(BaseSettings):
     google_redirect_uri: str = Field(default="http://127.0.0.1:8000/api/v1/auth/google/callback", alias="GOOGLE_REDIRECT_URI")
     frontend_base_url: str = Field(default="http://localhost:3000", alias="FRONTEND_BASE_URL")
 
+    media_zero_copy: bool = Field(default=True, alias="MEDIA_ZERO_COPY")
+    media_io_threads: int = Field(default=8, alias="MEDIA_IO_THREADS")
+    media_io_max_inflight: int = Field(default=32, alias="MEDIA_IO_MAX_INFLIGHT")
+    media_cache_bytes: int = Field(default=256 * 1024 * 1024, alias="MEDIA_CACHE_BYTES")
+    media_cache_head_bytes: int = Field(default=2 * 1024 * 1024, alias="MEDIA_CACHE_HEAD_BYTES")
+    max_video_upload_bytes: int = Field(default=8 * 1024 ** 3, alias="MAX_VIDEO_UPLOAD_BYTES")
+    max_image_upload_bytes: int = Field(default=10 * 1024 ** 2, alias="MAX_IMAGE_UPLOAD_BYTES")
+    max_concurrent_uploads: int = Field(default=4, alias="MAX_CONCURRENT_UPLOADS")
+    upload_sessions_dir: str = Field(default="", alias="UPLOAD_SESSIONS_DIR")
+    upload_session_ttl_seconds: int = Field(default=24 * 3600, alias="UPLOAD_SESSION_TTL_SECONDS")
+    media_gc_grace_seconds: int = Field(default=3600, alias="MEDIA_GC_GRACE_SECONDS")
+    user_media_rescan_seconds: float = Field(default=0, alias="USER_MEDIA_RESCAN_SECONDS")
+    media_worker_processes: int = Field(default=2, alias="MEDIA_WORKER_PROCESSES")
+    media_stat_ttl_seconds: float = Field(default=5, alias="MEDIA_STAT_TTL_SECONDS")
+    media_fd_pool_size: int = Field(default=64, alias="MEDIA_FD_POOL_SIZE")
+    media_readahead_max_bytes: int = Field(default=1024 * 1024, alias="MEDIA_READAHEAD_MAX_BYTES")
+    media_pin_hot_videos: int = Field(default=0, alias="MEDIA_PIN_HOT_VIDEOS")
+    media_pin_interval_seconds: float = Field(default=300, alias="MEDIA_PIN_INTERVAL_SECONDS")
+    media_signed_urls: bool = Field(default=False, alias="MEDIA_SIGNED_URLS")
+    media_url_ttl_seconds: int = Field(default=6 * 3600, alias="MEDIA_URL_TTL_SECONDS")
+    media_offload: str = Field(default="", alias="MEDIA_OFFLOAD")
+    media_offload_prefix: str = Field(default="/internal-media", alias="MEDIA_OFFLOAD_PREFIX")
+    media_egress_bytes_per_second: float = Field(default=0, alias="MEDIA_EGRESS_BYTES_PER_SECOND")
+    media_egress_headroom: float = Field(default=1.5, alias="MEDIA_EGRESS_HEADROOM")
+    media_egress_burst_seconds: float = Field(default=10, alias="MEDIA_EGRESS_BURST_SECONDS")
+    media_egress_idle_seconds: float = Field(default=60, alias="MEDIA_EGRESS_IDLE_SECONDS")
+    media_telemetry_bin_bytes: int = Field(default=1024 * 1024, alias="MEDIA_TELEMETRY_BIN_BYTES")
+    media_telemetry_flush_seconds: float = Field(default=30, alias="MEDIA_TELEMETRY_FLUSH_SECONDS")
+    media_prewarm_bins: int = Field(default=32, alias="MEDIA_PREWARM_BINS")
+    hls_segment_seconds: float = Field(default=6, alias="HLS_SEGMENT_SECONDS")
+    event_loop_lag_interval_seconds: float = Field(
+        default=0.5, alias="EVENT_LOOP_LAG_INTERVAL_SECONDS")
+
 
 _settings: Settings | None = None
 
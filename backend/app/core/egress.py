@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import secrets
+import time
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+# Refill is capped at this many seconds of the current rate once the
+# initial burst is spent, so an idle stream cannot bank a second burst.
+BUCKET_SECONDS = 1.0
+
+
+class EgressStream:
+    """Token bucket for one connection and file, paced at ``min(cap, fair share)``.
+
+    Concurrent and successive responses on the same connection for the same
+    file share the bucket, so the range requests a player sends over its
+    keep-alive connection do not each get a new burst.
+    """
+
+    def __init__(
+        self, scheduler: EgressScheduler, key: tuple[str, str], cap: float | None, burst_bytes: float
+    ) -> None:
+        self.scheduler = scheduler
+        self.key = key
+        # Random, so /metrics can list streams without exposing the key.
+        self.id = secrets.token_hex(6)
+        self.cap = cap
+        self.tokens = burst_bytes
+        self.started = time.monotonic()
+        self.last_refill = self.started
+        self.idle_since = self.started
+        self.responses = 0
+        self.bytes_sent = 0
+        self.throttled_seconds = 0.0
+
+    @property
+    def rate(self) -> float:
+        share = self.scheduler.fair_share()
+        return min(self.cap, share) if self.cap else share
+
+    async def throttle(self, size: int) -> None:
+        """Wait until ``size`` more bytes may be sent."""
+        self.bytes_sent += size
+        metrics.inc("egress_bytes_total", size)
+        rate = self.rate
+        if math.isinf(rate):
+            return
+
+        now = time.monotonic()
+        refill = (now - self.last_refill) * rate
+        self.tokens = min(self.tokens + refill, max(self.tokens, rate * BUCKET_SECONDS))
+        self.last_refill = now
+        self.tokens -= size
+        if self.tokens < 0:
+            delay = -self.tokens / rate
+            self.throttled_seconds += delay
+            metrics.inc("egress_throttled_seconds_total", delay)
+            await asyncio.sleep(delay)
+
+    def close(self) -> None:
+        self.scheduler.close(self)
+
+    def bytes_per_second(self) -> float:
+        return self.bytes_sent / max(time.monotonic() - self.started, 1e-9)
+
+
+class EgressScheduler:
+    """Shares this worker's egress budget evenly across active media responses.
+
+    Each stream is also capped near its own playback bitrate, so a client
+    downloading at line rate cannot take the share of viewers who are watching.
+    Buckets are kept per ``(connection, file)`` and dropped after
+    ``idle_seconds`` without an open response. Keying on the connection
+    rather than the client address keeps viewers behind one NAT or proxy
+    from sharing a bucket.
+    """
+
+    def __init__(
+        self, total_bytes_per_second: float, headroom: float, burst_seconds: float, idle_seconds: float
+    ) -> None:
+        self.total_bytes_per_second = total_bytes_per_second
+        self.headroom = headroom
+        self.burst_seconds = burst_seconds
+        self.idle_seconds = idle_seconds
+        self._buckets: dict[tuple[str, str], EgressStream] = {}
+        self._active = 0
+        self._next_expiry = 0.0
+
+    def fair_share(self) -> float:
+        if self.total_bytes_per_second <= 0:
+            return math.inf
+        return self.total_bytes_per_second / max(self._active, 1)
+
+    def bitrate_cap(self, file_size: int, duration_seconds: float | None) -> float | None:
+        """Average bitrate of the file times the headroom factor, when known."""
+        if self.headroom > 0 and duration_seconds and duration_seconds > 0:
+            return file_size / duration_seconds * self.headroom
+        return None
+
+    def open(
+        self, connection: str, label: str, file_size: int, duration_seconds: float | None
+    ) -> EgressStream | None:
+        """Register a response body, or return None when nothing would limit it.
+
+        Reuses the connection's bucket for ``label`` while it has not been idle
+        for ``idle_seconds``; only a new bucket starts with a full burst.
+        """
+        cap = self.bitrate_cap(file_size, duration_seconds)
+        if cap is None and self.total_bytes_per_second <= 0:
+            return None
+
+        now = time.monotonic()
+        self._expire(now)
+        key = (connection, label)
+        stream = self._buckets.get(key)
+        if stream is None:
+            share = self.total_bytes_per_second / (self._active + 1) if self.total_bytes_per_second > 0 else math.inf
+            stream = EgressStream(self, key, cap, min(cap or math.inf, share) * self.burst_seconds)
+            self._buckets[key] = stream
+        if stream.responses == 0:
+            self._active += 1
+        stream.responses += 1
+        metrics.set("egress_active_streams", self._active)
+        return stream
+
+    def close(self, stream: EgressStream) -> None:
+        stream.responses -= 1
+        if stream.responses == 0:
+            self._active -= 1
+            stream.idle_since = time.monotonic()
+        metrics.set("egress_active_streams", self._active)
+
+    def _expire(self, now: float) -> None:
+        """Drop idle buckets, scanning at most once per ``idle_seconds``."""
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + self.idle_seconds
+        cutoff = now - self.idle_seconds
+        for key in [key for key, stream in self._buckets.items()
+                    if stream.responses == 0 and stream.idle_since <= cutoff]:
+            del self._buckets[key]
+
+    def snapshot(self) -> dict[str, object]:
+        """Figures for ``/metrics``, per stream under an opaque id; no connection or path is exposed."""
+        active = [stream for stream in self._buckets.values() if stream.responses]
+        rates = [stream.bytes_per_second() for stream in active]
+        return {
+            "active_streams": len(active),
+            "idle_buckets": len(self._buckets) - len(active),
+            "bytes_per_second_total": round(sum(rates)),
+            "bytes_per_second_max": round(max(rates, default=0)),
+            "throttled_streams": sum(1 for stream in active if stream.throttled_seconds > 0),
+            "streams": [
+                {
+                    "id": stream.id,
+                    "bytes_per_second": round(rate),
+                    "rate_limit": None if math.isinf(stream.rate) else round(stream.rate),
+                    "throttled_seconds": round(stream.throttled_seconds, 3),
+                }
+                for stream, rate in zip(active, rates)
+            ],
+        }
+
+
+_scheduler: EgressScheduler | None = None
+
+
+def get_egress_scheduler() -> EgressScheduler:
+    global _scheduler
+    if _scheduler is None:
+        settings = get_settings()
+        _scheduler = EgressScheduler(
+            settings.media_egress_bytes_per_second,
+            settings.media_egress_headroom,
+            settings.media_egress_burst_seconds,
+            settings.media_egress_idle_seconds,
+        )
+    return _scheduler
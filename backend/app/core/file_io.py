@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().media_io_threads, thread_name_prefix="media-io")
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(get_settings().media_io_max_inflight))
+    return _slots[1]
+
+
+async def run_io(fn: Callable[..., T], *args: Any) -> T:
+    """Run a blocking filesystem call on the media I/O pool.
+
+    At most ``MEDIA_IO_MAX_INFLIGHT`` calls are queued on the pool at once so
+    a slow disk backs requests up here instead of growing the pool's queue.
+    """
+    started = time.perf_counter()
+    async with _get_slots():
+        metrics.inc("media_io_wait_seconds_total", time.perf_counter() - started)
+        metrics.inc("media_io_calls_total")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args))
+
+
+async def open_file(path: str) -> BinaryIO:
+    return await run_io(open, path, "rb")
+
+
+async def pread(file_handle: BinaryIO, offset: int, size: int, readahead: int = 0) -> bytes:
+    """Read ``size`` bytes at ``offset``, hinting that ``readahead`` more bytes follow."""
+    if readahead > 0:
+        return await run_io(_pread_ahead, file_handle.fileno(), offset, size, readahead)
+    return await run_io(os.pread, file_handle.fileno(), size, offset)
+
+
+def advise(fd: int, offset: int, length: int, advice: int) -> None:
+    """``posix_fadvise`` where the platform has it; the hint is best effort."""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, offset, length, advice)
+        except OSError:
+            pass
+
+
+def _pread_ahead(fd: int, offset: int, size: int, readahead: int) -> bytes:
+    if hasattr(os, "POSIX_FADV_WILLNEED"):
+        advise(fd, offset + size, readahead, os.POSIX_FADV_WILLNEED)
+    return os.pread(fd, size, offset)
+
+
+async def advise_sequential(file_handle: BinaryIO, offset: int, length: int) -> None:
+    if hasattr(os, "POSIX_FADV_SEQUENTIAL"):
+        await run_io(advise, file_handle.fileno(), offset, length, os.POSIX_FADV_SEQUENTIAL)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
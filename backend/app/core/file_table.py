@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import BinaryIO
+
+from app.core.config import get_settings
+from app.core.file_io import run_io
+from app.core.media_cache import get_media_cache
+from app.core.metrics import metrics
+
+MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".ogg": "video/ogg",
+    ".mov": "video/quicktime",
+    ".avi": "video/x-msvideo",
+    ".wmv": "video/x-ms-wmv",
+    ".flv": "video/x-flv",
+    ".mkv": "video/x-matroska",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+
+def media_type_for(path: str) -> str:
+    return MEDIA_TYPES.get(Path(path).suffix.lower(), "application/octet-stream")
+
+
+def make_etag(stat: os.stat_result) -> str:
+    """Strong validator derived from inode, mtime and size."""
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+@dataclass(frozen=True)
+class FileMeta:
+    size: int
+    mtime_ns: int
+    inode: int
+    etag: str
+    last_modified: str
+    content_type: str
+    expires_at: float
+
+    @classmethod
+    def from_stat(cls, path: str, stat: os.stat_result, ttl_seconds: float) -> FileMeta:
+        return cls(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            inode=stat.st_ino,
+            etag=make_etag(stat),
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            content_type=media_type_for(path),
+            expires_at=time.monotonic() + ttl_seconds,
+        )
+
+    @property
+    def validator(self) -> tuple[int, int, int]:
+        return self.inode, self.mtime_ns, self.size
+
+
+class _PooledFile:
+    __slots__ = ("handle", "validator", "refs", "retired")
+
+    def __init__(self, handle: BinaryIO, validator: tuple[int, int, int]) -> None:
+        self.handle = handle
+        self.validator = validator
+        self.refs = 0
+        self.retired = False
+
+
+class MediaFileTable:
+    """TTL cache of media file metadata plus a pool of shared read-only descriptors.
+
+    Streaming reads use ``os.pread`` (or an explicit sendfile offset), so one
+    descriptor can serve any number of concurrent responses. A descriptor is
+    reused only while it matches the cached metadata; replaced files get a
+    fresh one, and retired descriptors are closed once their last reader is done.
+    """
+
+    def __init__(self, ttl_seconds: float, max_open: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_open = max_open
+        self._meta: dict[str, FileMeta] = {}
+        self._open: OrderedDict[str, _PooledFile] = OrderedDict()
+        self._leases: dict[int, _PooledFile] = {}
+
+    async def stat(self, path: str) -> FileMeta:
+        """Metadata for ``path``; raises FileNotFoundError like ``os.stat``."""
+        meta = self._meta.get(path)
+        if meta is not None and meta.expires_at > time.monotonic():
+            metrics.inc("media_stat_cache_hits_total")
+            return meta
+        metrics.inc("media_stat_cache_misses_total")
+        stat = await run_io(os.stat, path)
+        meta = FileMeta.from_stat(path, stat, self.ttl_seconds)
+        if self.ttl_seconds > 0:
+            self._meta[path] = meta
+        return meta
+
+    async def acquire(self, path: str, meta: FileMeta) -> BinaryIO:
+        """A read-only handle for ``path``; give it back with ``release``."""
+        entry = self._open.get(path)
+        if entry is not None and entry.validator == meta.validator:
+            self._open.move_to_end(path)
+            metrics.inc("media_fd_pool_hits_total")
+        else:
+            metrics.inc("media_fd_pool_misses_total")
+            entry = _PooledFile(await run_io(open, path, "rb"), meta.validator)
+            if self.max_open > 0:
+                self._retire(self._open.pop(path, None))
+                self._open[path] = entry
+                while len(self._open) > self.max_open:
+                    self._retire(self._open.popitem(last=False)[1])
+            else:
+                entry.retired = True
+        entry.refs += 1
+        self._leases[id(entry.handle)] = entry
+        metrics.set("media_fd_pool_open", len(self._open))
+        return entry.handle
+
+    def release(self, handle: BinaryIO) -> None:
+        entry = self._leases.get(id(handle))
+        if entry is None:
+            handle.close()
+            return
+        entry.refs -= 1
+        if entry.refs <= 0:
+            del self._leases[id(handle)]
+            if entry.retired:
+                entry.handle.close()
+
+    def invalidate(self, path: str) -> None:
+        """Forget everything known about ``path`` after it was replaced or removed."""
+        self._meta.pop(path, None)
+        self._retire(self._open.pop(path, None))
+        get_media_cache().invalidate(path)
+        metrics.set("media_fd_pool_open", len(self._open))
+
+    def _retire(self, entry: _PooledFile | None) -> None:
+        if entry is None:
+            return
+        entry.retired = True
+        if entry.refs <= 0:
+            self._leases.pop(id(entry.handle), None)
+            entry.handle.close()
+
+    def close_all(self) -> None:
+        for entry in list(self._open.values()):
+            self._retire(entry)
+        self._open.clear()
+        self._meta.clear()
+
+
+_table: MediaFileTable | None = None
+
+
+def get_file_table() -> MediaFileTable:
+    global _table
+    if _table is None:
+        settings = get_settings()
+        _table = MediaFileTable(settings.media_stat_ttl_seconds, settings.media_fd_pool_size)
+    return _table
+
+
+def invalidate_media_file(path: str) -> None:
+    """Called by code that writes, replaces or deletes a file under ``media/``."""
+    get_file_table().invalidate(os.path.abspath(path))
@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import math
+import os
+import shutil
+import struct
+from dataclasses import dataclass, field
+
+from app.core.mp4 import (
+    Mp4Error,
+    Mp4Track,
+    composition_offsets,
+    iter_boxes,
+    mp4_errors,
+    read_tracks,
+    sample_offsets,
+    sample_sizes,
+    sample_times,
+    sync_samples,
+)
+
+PLAYLIST_NAME = "index.m3u8"
+
+TS_PACKET_SIZE = 188
+PAT_PID = 0x0000
+PMT_PID = 0x1000
+VIDEO_PID = 0x0100
+AUDIO_PID = 0x0101
+STREAM_TYPE_H264 = 0x1B
+STREAM_TYPE_AAC = 0x0F
+
+# Same start delay ffmpeg uses, so PCR can run a little ahead of the first DTS.
+PTS_OFFSET = 126000
+
+AUD_NAL = b"\x00\x00\x00\x01\x09\xf0"
+START_CODE = b"\x00\x00\x00\x01"
+
+ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050,
+                     16000, 12000, 11025, 8000, 7350]
+
+
+def _crc32_mpeg2(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+            crc &= 0xFFFFFFFF
+    return crc
+
+
+@dataclass
+class _Stream:
+    pid: int
+    stream_id: int
+    timescale: int
+    times: list[int]
+    cts: list[int]
+    offsets: list[int]
+    sizes: list[int]
+    keyframes: set[int] = field(default_factory=set)
+    # H.264: NAL length size and SPS/PPS in Annex B form. AAC: ADTS fields.
+    nal_length_size: int = 4
+    parameter_sets: bytes = b""
+    adts: tuple[int, int, int] | None = None
+    continuity: int = 0
+
+    def seconds(self, n: int) -> float:
+        return self.times[n] / self.timescale
+
+    def ts90k(self, value: int) -> int:
+        return value * 90000 // self.timescale + PTS_OFFSET
+
+
+def _sample_entry(track: Mp4Track) -> tuple[bytes, int, int]:
+    """The first ``stsd`` entry of ``track`` as ``(data, payload_start, end)``."""
+    stsd = track.boxes.get(b"stsd")
+    if not stsd or len(stsd) < 16:
+        raise Mp4Error("Track has no sample description")
+    (size,) = struct.unpack_from(">I", stsd, 8)
+    return stsd, 16, min(8 + size, len(stsd))
+
+
+def _avc_config(track: Mp4Track) -> tuple[int, bytes]:
+    data, start, end = _sample_entry(track)
+    # Visual sample entry fields take 78 bytes before the child boxes.
+    for box_type, payload, box_end in iter_boxes(data, start + 78, end):
+        if box_type != b"avcC":
+            continue
+        nal_length_size = (data[payload + 4] & 0x03) + 1
+        pos = payload + 5
+        parameter_sets = bytearray()
+        for mask in (0x1F, 0xFF):
+            count = data[pos] & mask
+            pos += 1
+            for _ in range(count):
+                (length,) = struct.unpack_from(">H", data, pos)
+                parameter_sets += START_CODE + data[pos + 2:pos + 2 + length]
+                pos += 2 + length
+        return nal_length_size, bytes(parameter_sets)
+    raise Mp4Error("avc1 sample entry has no avcC box")
+
+
+def _descriptor(data: bytes, pos: int) -> tuple[int, int, int]:
+    """MPEG-4 descriptor header at ``pos`` as ``(tag, payload_start, payload_end)``."""
+    tag = data[pos]
+    pos += 1
+    length = 0
+    for _ in range(4):
+        byte = data[pos]
+        pos += 1
+        length = (length << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            break
+    return tag, pos, pos + length
+
+
+def _aac_config(track: Mp4Track) -> tuple[int, int, int]:
+    """``(profile, sampling_index, channels)`` for ADTS headers, from ``esds``."""
+    data, start, end = _sample_entry(track)
+    # Audio sample entry fields take 28 bytes before the child boxes.
+    for box_type, payload, box_end in iter_boxes(data, start + 28, end):
+        if box_type != b"esds":
+            continue
+        tag, pos, desc_end = _descriptor(data, payload + 4)
+        if tag != 0x03:
+            break
+        flags = data[pos + 2]
+        pos += 3
+        if flags & 0x80:
+            pos += 2
+        if flags & 0x40:
+            pos += 1 + data[pos]
+        if flags & 0x20:
+            pos += 2
+        tag, pos, desc_end = _descriptor(data, pos)
+        if tag != 0x04:
+            break
+        tag, pos, desc_end = _descriptor(data, pos + 13)
+        if tag != 0x05 or desc_end - pos < 2:
+            break
+        object_type = data[pos] >> 3
+        sampling_index = ((data[pos] & 0x07) << 1) | (data[pos + 1] >> 7)
+        channels = (data[pos + 1] >> 3) & 0x0F
+        if object_type not in (1, 2, 3, 4) or sampling_index >= len(ADTS_SAMPLE_RATES):
+            raise Mp4Error(f"Unsupported AAC configuration (object type {object_type})")
+        return object_type - 1, sampling_index, channels
+    raise Mp4Error("mp4a sample entry has no usable esds box")
+
+
+def _stream(track: Mp4Track, pid: int, stream_id: int) -> _Stream:
+    if not track.timescale or not {b"stts", b"stsz", b"stsc"} <= track.boxes.keys():
+        raise Mp4Error("Track has no sample table")
+    sizes = sample_sizes(track.boxes[b"stsz"])
+    offsets = sample_offsets(track)
+    times = sample_times(track.boxes[b"stts"], len(sizes))
+    count = min(len(sizes), len(offsets), len(times))
+    return _Stream(
+        pid=pid,
+        stream_id=stream_id,
+        timescale=track.timescale,
+        times=times[:count],
+        cts=composition_offsets(track, count),
+        offsets=offsets[:count],
+        sizes=sizes[:count],
+    )
+
+
+def _video_stream(track: Mp4Track) -> _Stream:
+    if track.codec not in ("avc1", "avc3"):
+        raise Mp4Error(f"HLS packaging needs H.264 video, not {track.codec or 'unknown'}")
+    stream = _stream(track, VIDEO_PID, 0xE0)
+    stream.keyframes = set(sync_samples(track, len(stream.times)))
+    stream.nal_length_size, stream.parameter_sets = _avc_config(track)
+    return stream
+
+
+def _audio_stream(track: Mp4Track) -> _Stream:
+    if track.codec != "mp4a":
+        raise Mp4Error(f"HLS packaging needs AAC audio, not {track.codec or 'unknown'}")
+    stream = _stream(track, AUDIO_PID, 0xC0)
+    stream.adts = _aac_config(track)
+    return stream
+
+
+def _section(table_id: int, table_id_extension: int, body: bytes) -> bytes:
+    """A PSI section with ``section_length`` and the trailing CRC filled in."""
+    header = struct.pack(">BHHBBB", table_id, 0xB000 | (len(body) + 9),
+                         table_id_extension, 0xC1, 0x00, 0x00)
+    section = header + body
+    return section + struct.pack(">I", _crc32_mpeg2(section))
+
+
+def _psi_packet(pid: int, section: bytes, continuity: int) -> bytes:
+    payload = b"\x00" + section
+    header = struct.pack(">BHB", 0x47, 0x4000 | pid, 0x10 | continuity)
+    return header + payload + b"\xff" * (TS_PACKET_SIZE - 4 - len(payload))
+
+
+def _pes_timestamp(prefix: int, value: int) -> bytes:
+    value &= (1 << 33) - 1
+    return struct.pack(
+        ">BHH",
+        (prefix << 4) | ((value >> 29) & 0x0E) | 1,
+        ((value >> 14) & 0xFFFE) | 1,
+        ((value << 1) & 0xFFFE) | 1,
+    )
+
+
+def _pcr(value: int) -> bytes:
+    base = value & ((1 << 33) - 1)
+    return struct.pack(">IH", base >> 1, ((base & 1) << 15) | 0x7E00)
+
+
+def _pes(stream_id: int, payload: bytes, pts: int, dts: int | None) -> bytes:
+    if dts is None or dts == pts:
+        flags, header = 0x80, _pes_timestamp(0x2, pts)
+    else:
+        flags, header = 0xC0, _pes_timestamp(0x3, pts) + _pes_timestamp(0x1, dts)
+    length = 3 + len(header) + len(payload)
+    # Video PES may exceed the 16-bit length field; 0 means "unbounded".
+    packet_length = length if length <= 0xFFFF else 0
+    return (struct.pack(">BBBBHBBB", 0, 0, 1, stream_id, packet_length, 0x80, flags, len(header))
+            + header + payload)
+
+
+def _packetize(stream: _Stream, pes: bytes, pcr: int | None, random_access: bool) -> bytes:
+    out = bytearray()
+    pos = 0
+    first = True
+    while pos < len(pes):
+        adaptation = bytearray()
+        if first and (pcr is not None or random_access):
+            adaptation.append((0x40 if random_access else 0) | (0x10 if pcr is not None else 0))
+            if pcr is not None:
+                adaptation += _pcr(pcr)
+        space = TS_PACKET_SIZE - 4 - (len(adaptation) + 1 if adaptation else 0)
+        chunk = pes[pos:pos + space]
+        stuffing = space - len(chunk)
+        if stuffing:
+            if adaptation:
+                adaptation += b"\xff" * stuffing
+            elif stuffing == 1:
+                # An empty adaptation field is just its length byte.
+                adaptation = None
+            else:
+                adaptation = bytearray(b"\x00" + b"\xff" * (stuffing - 2))
+        has_adaptation = adaptation is None or bool(adaptation)
+        out += struct.pack(
+            ">BHB",
+            0x47,
+            (0x4000 if first else 0) | stream.pid,
+            (0x30 if has_adaptation else 0x10) | stream.continuity,
+        )
+        if adaptation is None:
+            out.append(0)
+        elif adaptation:
+            out.append(len(adaptation))
+            out += adaptation
+        out += chunk
+        stream.continuity = (stream.continuity + 1) & 0x0F
+        pos += len(chunk)
+        first = False
+    return bytes(out)
+
+
+def _annex_b(sample: bytes, nal_length_size: int) -> bytes:
+    out = bytearray()
+    pos = 0
+    while pos + nal_length_size <= len(sample):
+        length = int.from_bytes(sample[pos:pos + nal_length_size], "big")
+        pos += nal_length_size
+        nal = sample[pos:pos + length]
+        pos += length
+        # Parameter sets and delimiters are written by the muxer itself.
+        if nal and (nal[0] & 0x1F) not in (7, 8, 9):
+            out += START_CODE + nal
+    return bytes(out)
+
+
+def _adts_header(config: tuple[int, int, int], frame_length: int) -> bytes:
+    profile, sampling_index, channels = config
+    length = frame_length + 7
+    return bytes([
+        0xFF,
+        0xF1,
+        (profile << 6) | (sampling_index << 2) | (channels >> 2),
+        ((channels & 0x03) << 6) | (length >> 11),
+        (length >> 3) & 0xFF,
+        ((length & 0x07) << 5) | 0x1F,
+        0xFC,
+    ])
+
+
+def _cut_points(video: _Stream, segment_seconds: float) -> list[int]:
+    """Sample indexes that start a segment: the first keyframe at or after each target."""
+    cuts = [0]
+    for n in sorted(video.keyframes):
+        if n > 0 and video.seconds(n) - video.seconds(cuts[-1]) >= segment_seconds:
+            cuts.append(n)
+    return cuts
+
+
+def _write_segment(f, path: str, samples: list[tuple[_Stream, int]], psi: list[bytes]) -> None:
+    with open(path, "wb") as out:
+        for packet in psi:
+            out.write(packet)
+        for stream, n in samples:
+            f.seek(stream.offsets[n])
+            data = f.read(stream.sizes[n])
+            if len(data) != stream.sizes[n]:
+                raise Mp4Error("Sample data runs past the end of the file")
+            dts = stream.ts90k(stream.times[n])
+            if stream.adts is not None:
+                pes = _pes(stream.stream_id, _adts_header(stream.adts, len(data)) + data, dts, None)
+                out.write(_packetize(stream, pes, None, random_access=False))
+                continue
+            keyframe = n in stream.keyframes
+            payload = AUD_NAL
+            if keyframe:
+                payload += stream.parameter_sets
+            payload += _annex_b(data, stream.nal_length_size)
+            pts = stream.ts90k(stream.times[n] + stream.cts[n])
+            pes = _pes(stream.stream_id, payload, pts, dts)
+            out.write(_packetize(stream, pes, dts, random_access=keyframe))
+
+
+def _swap_in(tmp_dir: str, out_dir: str) -> None:
+    """Move a finished rendition into place, tolerating a concurrent run for the same blob.
+
+    The old rendition is renamed aside rather than deleted first, so two
+    overlapping runs never delete each other's output. If another run moved
+    its rendition in first, the two are identical (the blob is content
+    addressed) and this one is discarded.
+    """
+    aside = f"{out_dir}.old-{os.getpid()}"
+    try:
+        os.replace(out_dir, aside)
+    except FileNotFoundError:
+        aside = ""
+    try:
+        os.replace(tmp_dir, out_dir)
+    except OSError:
+        if not os.path.exists(os.path.join(out_dir, PLAYLIST_NAME)):
+            raise
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if aside:
+        shutil.rmtree(aside, ignore_errors=True)
+
+
+@mp4_errors
+def package_hls(src: str, out_dir: str, segment_seconds: float) -> int:
+    """Split an H.264/AAC MP4 into MPEG-TS segments plus a VOD ``index.m3u8``.
+
+    Segments start on keyframes taken from the sample tables, so the stream is
+    remuxed, never transcoded. Output is written next to ``out_dir`` and moved
+    into place in one rename; a rendition another run put there first is kept.
+    Returns the number of segments.
+    """
+    duration, tracks = read_tracks(src)
+    video_track = next((t for t in tracks if t.handler == "vide"), None)
+    audio_track = next((t for t in tracks if t.handler == "soun"), None)
+    if video_track is None:
+        raise Mp4Error("HLS packaging needs a video track")
+    video = _video_stream(video_track)
+    if not video.times:
+        raise Mp4Error("Video track has no samples")
+    streams = [video]
+    if audio_track is not None:
+        streams.append(_audio_stream(audio_track))
+    file_size = os.path.getsize(src)
+    for stream in streams:
+        if any(offset + size > file_size for offset, size in zip(stream.offsets, stream.sizes)):
+            raise Mp4Error("Sample table points past the end of the file")
+
+    pmt_body = struct.pack(">HH", 0xE000 | VIDEO_PID, 0xF000)
+    for stream in streams:
+        stream_type = STREAM_TYPE_AAC if stream.adts is not None else STREAM_TYPE_H264
+        pmt_body += struct.pack(">BHH", stream_type, 0xE000 | stream.pid, 0xF000)
+    pat = _section(0x00, 1, struct.pack(">HH", 1, 0xE000 | PMT_PID))
+    pmt = _section(0x02, 1, pmt_body)
+
+    cuts = _cut_points(video, segment_seconds)
+    bounds = [video.seconds(n) for n in cuts]
+    end_seconds = max(duration, video.seconds(len(video.times) - 1))
+
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        entries: list[tuple[str, float]] = []
+        audio_next = 0
+        psi_continuity = 0
+        with open(src, "rb") as f:
+            for i, start in enumerate(cuts):
+                stop = cuts[i + 1] if i + 1 < len(cuts) else len(video.times)
+                seg_end = bounds[i + 1] if i + 1 < len(cuts) else math.inf
+                samples = [(video, n) for n in range(start, stop)]
+                if len(streams) > 1:
+                    audio = streams[1]
+                    while audio_next < len(audio.times) and audio.seconds(audio_next) < seg_end:
+                        samples.append((audio, audio_next))
+                        audio_next += 1
+                samples.sort(key=lambda s: s[0].seconds(s[1]))
+
+                psi = [_psi_packet(PAT_PID, pat, psi_continuity),
+                       _psi_packet(PMT_PID, pmt, psi_continuity)]
+                psi_continuity = (psi_continuity + 1) & 0x0F
+                name = f"seg_{i:05d}.ts"
+                _write_segment(f, os.path.join(tmp_dir, name), samples, psi)
+                entries.append((name, min(seg_end, end_seconds) - bounds[i]))
+
+        target = max(1, math.ceil(max(d for _, d in entries)))
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{target}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:VOD",
+        ]
+        for name, seconds in entries:
+            lines += [f"#EXTINF:{seconds:.3f},", name]
+        lines.append("#EXT-X-ENDLIST")
+        with open(os.path.join(tmp_dir, PLAYLIST_NAME), "w") as playlist:
+            playlist.write("\n".join(lines) + "\n")
+
+        _swap_in(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return len(entries)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import os
+
+# Widths generated per media folder; requests for other widths are refused,
+# so the lazy endpoint cannot be used to render arbitrary sizes.
+VARIANT_WIDTHS: dict[str, tuple[int, ...]] = {
+    "thumbnails": (160, 320, 640),
+    "avatars": (48, 96, 192),
+    "banners": (640, 1280),
+}
+VARIANT_FORMATS: dict[str, str] = {"webp": "WEBP", "jpg": "JPEG"}
+
+
+class ImageError(Exception):
+    pass
+
+
+def render_variant(src: str, dst: str, width: int, fmt: str) -> str:
+    """Write ``src`` scaled down to ``width`` pixels wide as ``fmt`` to ``dst``.
+
+    Runs in the media process pool. Images narrower than ``width`` are only
+    re-encoded, never upscaled. The file is renamed into place when complete.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as e:
+        raise ImageError("Pillow is not installed") from e
+
+    try:
+        with Image.open(src) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            if fmt == "jpg" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            tmp = f"{dst}.tmp-{os.getpid()}"
+            image.save(tmp, VARIANT_FORMATS[fmt], quality=80)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageError(f"Cannot render {src}: {e}") from e
+    os.replace(tmp, dst)
+    return dst
+
+
+def render_variants(src: str, variants: list[tuple[str, int, str]]) -> int:
+    """Render every missing ``(dst, width, fmt)``; returns how many were written."""
+    written = 0
+    for dst, width, fmt in variants:
+        if not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src):
+            render_variant(src, dst, width, fmt)
+            written += 1
+    return written
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+BLOCK_SIZE = 65536
+
+
+class MediaBlockCache:
+    """LRU cache of fixed-size file blocks, bounded by a byte budget.
+
+    Entries are keyed by ``(path, block_index)``. Each path remembers the
+    ``(mtime_ns, size)`` it was cached under; ``validate`` drops every block of
+    a path whose file has changed since.
+    """
+
+    def __init__(self, budget_bytes: int, head_bytes: int, block_size: int = BLOCK_SIZE) -> None:
+        self.budget_bytes = budget_bytes
+        self.head_bytes = head_bytes
+        self.block_size = block_size
+        self.used_bytes = 0
+        self._blocks: OrderedDict[tuple[str, int], bytes] = OrderedDict()
+        self._by_path: dict[str, set[int]] = {}
+        self._validators: dict[str, tuple[int, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def validate(self, path: str, mtime_ns: int, size: int) -> None:
+        validator = (mtime_ns, size)
+        if self._validators.get(path) != validator:
+            self.invalidate(path)
+            self._validators[path] = validator
+
+    def invalidate(self, path: str) -> None:
+        for index in self._by_path.pop(path, ()):
+            self.used_bytes -= len(self._blocks.pop((path, index)))
+        self._validators.pop(path, None)
+        self._report()
+
+    def is_head(self, index: int) -> bool:
+        return index * self.block_size < self.head_bytes
+
+    def get(self, path: str, index: int) -> bytes | None:
+        block = self._blocks.get((path, index))
+        if block is None:
+            metrics.inc("media_cache_misses_total")
+        else:
+            self._blocks.move_to_end((path, index))
+            metrics.inc("media_cache_hits_total")
+        self._report()
+        return block
+
+    def put(self, path: str, index: int, block: bytes) -> None:
+        if not self.enabled or len(block) > self.budget_bytes or path not in self._validators:
+            return
+        key = (path, index)
+        previous = self._blocks.pop(key, None)
+        if previous is not None:
+            self.used_bytes -= len(previous)
+        self._blocks[key] = block
+        self._by_path.setdefault(path, set()).add(index)
+        self.used_bytes += len(block)
+        while self.used_bytes > self.budget_bytes:
+            (old_path, old_index), old_block = self._blocks.popitem(last=False)
+            self.used_bytes -= len(old_block)
+            indexes = self._by_path[old_path]
+            indexes.discard(old_index)
+            if not indexes:
+                del self._by_path[old_path]
+            metrics.inc("media_cache_evictions_total")
+        self._report()
+
+    def _report(self) -> None:
+        hits = metrics.get("media_cache_hits_total")
+        lookups = hits + metrics.get("media_cache_misses_total")
+        metrics.set("media_cache_bytes", self.used_bytes)
+        metrics.set("media_cache_hit_ratio", hits / lookups if lookups else 0.0)
+
+
+_media_cache: MediaBlockCache | None = None
+
+
+def get_media_cache() -> MediaBlockCache:
+    global _media_cache
+    if _media_cache is None:
+        settings = get_settings()
+        _media_cache = MediaBlockCache(settings.media_cache_bytes, settings.media_cache_head_bytes)
+    return _media_cache
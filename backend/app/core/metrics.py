@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+
+class Metrics:
+    """Process-local counters and gauges exposed on ``GET /metrics``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0.0) + value
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self._values[name] = value
+
+    def set_max(self, name: str, value: float) -> None:
+        with self._lock:
+            if value > self._values.get(name, 0.0):
+                self._values[name] = value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._values.get(name, 0.0)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(sorted(self._values.items()))
+
+
+metrics = Metrics()
+
+
+async def monitor_event_loop_lag(interval: float) -> None:
+    """Record how late the loop wakes up from a sleep, i.e. how long it was blocked."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - expected, 0.0)
+        metrics.set("event_loop_lag_seconds_last", lag)
+        metrics.set_max("event_loop_lag_seconds_max", lag)
+        metrics.inc("event_loop_lag_seconds_total", lag)
+        metrics.inc("event_loop_lag_samples_total")
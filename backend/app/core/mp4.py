@@ -0,0 +1,441 @@
+"""Minimal ISO-BMFF (MP4/MOV) reader.
+
+Only the ``moov`` box is read. It yields the overall duration, the video
+resolution and codecs, and a keyframe index of ``(seconds, byte_offset)``
+pairs built from the video track's sample table.
+"""
+from __future__ import annotations
+
+import functools
+import os
+import struct
+import tempfile
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Iterator, TypeVar
+
+MAX_MOOV_BYTES = 256 * 1024 * 1024
+# Per track; about 19 hours at 60 fps. Bounds the lists built from the tables.
+MAX_SAMPLES = 1 << 22
+_CONTAINERS = {b"trak", b"mdia", b"minf", b"stbl"}
+
+T = TypeVar("T")
+
+
+class Mp4Error(ValueError):
+    pass
+
+
+def mp4_errors(fn: Callable[..., T]) -> Callable[..., T]:
+    """Report malformed input as ``Mp4Error`` instead of ``struct.error``/``IndexError``."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except (struct.error, IndexError) as e:
+            raise Mp4Error(f"Malformed MP4: {e}") from e
+    return wrapper
+
+
+def _entry_count(box: bytes, entry_size: int, header: int = 8) -> int:
+    """Entry count of a sample table box, checked against the box's length."""
+    if len(box) < header:
+        raise Mp4Error("Truncated sample table")
+    (count,) = struct.unpack_from(">I", box, 4)
+    if header + count * entry_size > len(box):
+        raise Mp4Error("Sample table has more entries than its box holds")
+    return count
+
+
+@dataclass
+class Mp4Track:
+    handler: str = ""
+    codec: str = ""
+    timescale: int = 0
+    width: int = 0
+    height: int = 0
+    boxes: dict[bytes, bytes] = field(default_factory=dict)
+
+
+@dataclass
+class Mp4Info:
+    duration_seconds: float
+    width: int | None
+    height: int | None
+    video_codec: str | None
+    audio_codec: str | None
+    keyframes: list[tuple[float, int]]
+
+
+def iter_boxes(data: bytes, start: int = 0, end: int | None = None) -> Iterator[tuple[bytes, int, int]]:
+    """Yield ``(type, payload_start, box_end)`` for each box in ``data[start:end]``."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                raise Mp4Error("Truncated box header")
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise Mp4Error(f"Invalid size for box {box_type!r}")
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def read_top_level_boxes(f: BinaryIO) -> Iterator[tuple[bytes, int, int, int]]:
+    """Yield ``(type, box_start, header_size, box_size)`` for each top-level box of a file."""
+    file_size = os.fstat(f.fileno()).st_size
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header or pos + size > file_size:
+            raise Mp4Error(f"Invalid size for top-level box {box_type!r}")
+        yield box_type, pos, header, size
+        pos += size
+
+
+def read_moov(f: BinaryIO) -> bytes:
+    for box_type, start, header, size in read_top_level_boxes(f):
+        if box_type == b"moov":
+            if size > MAX_MOOV_BYTES:
+                raise Mp4Error("moov box is too large")
+            f.seek(start + header)
+            return f.read(size - header)
+    raise Mp4Error("No moov box found")
+
+
+def _timescale_and_duration(data: bytes, start: int) -> tuple[int, int]:
+    """Parse the common head of ``mvhd``/``mdhd``."""
+    version = data[start]
+    if version == 1:
+        return struct.unpack_from(">IQ", data, start + 20)
+    return struct.unpack_from(">II", data, start + 12)
+
+
+def _parse_track(data: bytes, start: int, end: int) -> Mp4Track:
+    track = Mp4Track()
+
+    def walk(s: int, e: int) -> None:
+        for box_type, payload, box_end in iter_boxes(data, s, e):
+            if box_type in _CONTAINERS:
+                walk(payload, box_end)
+            elif box_type == b"tkhd":
+                offset = payload + (88 if data[payload] == 1 else 76)
+                width, height = struct.unpack_from(">II", data, offset)
+                track.width, track.height = width >> 16, height >> 16
+            elif box_type == b"mdhd":
+                track.timescale, _ = _timescale_and_duration(data, payload)
+            elif box_type == b"hdlr":
+                track.handler = data[payload + 8:payload + 12].decode("latin-1")
+            elif box_type == b"stsd":
+                if box_end - payload >= 16:
+                    track.codec = data[payload + 12:payload + 16].decode("latin-1").strip()
+                track.boxes[box_type] = data[payload:box_end]
+            elif box_type in (b"stts", b"ctts", b"stss", b"stsc", b"stsz", b"stco", b"co64"):
+                track.boxes[box_type] = data[payload:box_end]
+
+    walk(start, end)
+    return track
+
+
+def sample_times(stts: bytes, count: int) -> list[int]:
+    """Decode time of each of the first ``count`` samples (``stts``)."""
+    entries = _entry_count(stts, 8)
+    times: list[int] = []
+    t = 0
+    for i in range(entries):
+        sample_count, delta = struct.unpack_from(">II", stts, 8 + 8 * i)
+        for _ in range(min(sample_count, count - len(times))):
+            times.append(t)
+            t += delta
+        if len(times) >= count:
+            break
+    return times
+
+
+def sample_sizes(stsz: bytes) -> list[int]:
+    if len(stsz) < 12:
+        raise Mp4Error("Truncated stsz box")
+    sample_size, sample_count = struct.unpack_from(">II", stsz, 4)
+    if sample_count > MAX_SAMPLES:
+        raise Mp4Error(f"Track has more than {MAX_SAMPLES} samples")
+    if sample_size:
+        return [sample_size] * sample_count
+    if 12 + 4 * sample_count > len(stsz):
+        raise Mp4Error("Sample table has more entries than its box holds")
+    return list(struct.unpack_from(f">{sample_count}I", stsz, 12))
+
+
+def composition_offsets(track: Mp4Track, count: int) -> list[int]:
+    """Per-sample presentation minus decode time (``ctts``), zero when absent."""
+    if b"ctts" not in track.boxes:
+        return [0] * count
+    ctts = track.boxes[b"ctts"]
+    fmt = ">Ii" if ctts[0] == 1 else ">II"
+    entries = _entry_count(ctts, 8)
+    offsets: list[int] = []
+    for i in range(entries):
+        sample_count, offset = struct.unpack_from(fmt, ctts, 8 + 8 * i)
+        offsets.extend([offset] * min(sample_count, count - len(offsets)))
+        if len(offsets) >= count:
+            break
+    return offsets + [0] * (count - len(offsets))
+
+
+def sync_samples(track: Mp4Track, count: int) -> list[int]:
+    """Zero-based indexes of keyframes; every sample when ``stss`` is absent."""
+    if b"stss" not in track.boxes:
+        return list(range(count))
+    stss = track.boxes[b"stss"]
+    entries = _entry_count(stss, 4)
+    return [n - 1 for n in struct.unpack_from(f">{entries}I", stss, 8)]
+
+
+def chunk_offsets(track: Mp4Track) -> list[int]:
+    if b"co64" in track.boxes:
+        box, fmt = track.boxes[b"co64"], "Q"
+    elif b"stco" in track.boxes:
+        box, fmt = track.boxes[b"stco"], "I"
+    else:
+        raise Mp4Error("Track has no chunk offset table")
+    count = _entry_count(box, struct.calcsize(fmt))
+    return list(struct.unpack_from(f">{count}{fmt}", box, 8))
+
+
+def sample_offsets(track: Mp4Track) -> list[int]:
+    """Byte offset of every sample of ``track``, in decode order."""
+    sizes = sample_sizes(track.boxes[b"stsz"])
+    chunks = chunk_offsets(track)
+    stsc = track.boxes[b"stsc"]
+    entry_count = _entry_count(stsc, 12)
+    runs = [struct.unpack_from(">III", stsc, 8 + 12 * i)[:2] for i in range(entry_count)]
+
+    offsets: list[int] = []
+    sample = 0
+    for i, (first_chunk, per_chunk) in enumerate(runs):
+        last_chunk = runs[i + 1][0] - 1 if i + 1 < len(runs) else len(chunks)
+        if first_chunk < 1 or last_chunk > len(chunks):
+            raise Mp4Error("stsc refers to chunks outside stco")
+        for chunk in range(first_chunk - 1, last_chunk):
+            offset = chunks[chunk]
+            for _ in range(per_chunk):
+                if sample >= len(sizes):
+                    return offsets
+                offsets.append(offset)
+                offset += sizes[sample]
+                sample += 1
+    return offsets
+
+
+def keyframe_index(track: Mp4Track, min_gap_seconds: float = 1.0) -> list[tuple[float, int]]:
+    """Keyframes of ``track`` as ``(seconds, byte_offset)``, at most one per ``min_gap_seconds``."""
+    if not track.timescale or not {b"stts", b"stsz", b"stsc"} <= track.boxes.keys():
+        return []
+    offsets = sample_offsets(track)
+    times = sample_times(track.boxes[b"stts"], len(offsets))
+    sync = sync_samples(track, min(len(times), len(offsets)))
+
+    index: list[tuple[float, int]] = []
+    for n in sync:
+        if n >= len(times) or n >= len(offsets):
+            break
+        seconds = times[n] / track.timescale
+        if not index or seconds - index[-1][0] >= min_gap_seconds:
+            index.append((round(seconds, 3), offsets[n]))
+    return index
+
+
+def parse_moov(moov: bytes) -> tuple[float, list[Mp4Track]]:
+    duration = 0.0
+    tracks: list[Mp4Track] = []
+    for box_type, payload, box_end in iter_boxes(moov):
+        if box_type == b"mvhd":
+            timescale, units = _timescale_and_duration(moov, payload)
+            duration = units / timescale if timescale else 0.0
+        elif box_type == b"trak":
+            tracks.append(_parse_track(moov, payload, box_end))
+    return duration, tracks
+
+
+def read_tracks(path: str) -> tuple[float, list[Mp4Track]]:
+    with open(path, "rb") as f:
+        return parse_moov(read_moov(f))
+
+
+@mp4_errors
+def probe_mp4(path: str) -> Mp4Info:
+    """Read duration, resolution, codecs and the keyframe index of an MP4 file."""
+    duration, tracks = read_tracks(path)
+    video = next((t for t in tracks if t.handler == "vide"), None)
+    audio = next((t for t in tracks if t.handler == "soun"), None)
+    return Mp4Info(
+        duration_seconds=duration,
+        width=video.width if video else None,
+        height=video.height if video else None,
+        video_codec=video.codec or None if video else None,
+        audio_codec=audio.codec or None if audio else None,
+        keyframes=keyframe_index(video) if video else [],
+    )
+
+
+def keyframe_offset(keyframes: list[list[float]] | list[tuple[float, int]], seconds: float) -> tuple[float, int] | None:
+    """Last keyframe at or before ``seconds``."""
+    i = bisect_right([k[0] for k in keyframes], seconds)
+    if i == 0:
+        return None
+    t, offset = keyframes[i - 1]
+    return float(t), int(offset)
+
+
+def seconds_at_offset(keyframes: list[list[float]] | list[tuple[float, int]], offset: int) -> float | None:
+    """Time of the last keyframe stored at or before byte ``offset``; 0 for the header bytes."""
+    if not keyframes:
+        return None
+    i = bisect_right([k[1] for k in keyframes], offset)
+    return float(keyframes[i - 1][0]) if i else 0.0
+
+
+def format_duration(seconds: float) -> str:
+    total = int(round(seconds))
+    hours, rest = divmod(total, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+_OFFSET_CONTAINERS = {b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _box(box_type: bytes, body: bytes) -> bytes:
+    if len(body) + 8 > 0xFFFFFFFF:
+        return struct.pack(">I4sQ", 1, box_type, len(body) + 16) + body
+    return struct.pack(">I4s", len(body) + 8, box_type) + body
+
+
+def _shift_chunk_offsets(
+    data: bytes, start: int, end: int, shift: Callable[[int], int], use_co64: bool
+) -> bytes:
+    """Rebuild the boxes in ``data[start:end]`` with every chunk offset mapped through ``shift``."""
+    out = bytearray()
+    for box_type, payload, box_end in iter_boxes(data, start, end):
+        if box_type in _OFFSET_CONTAINERS:
+            out += _box(box_type, _shift_chunk_offsets(data, payload, box_end, shift, use_co64))
+        elif box_type in (b"stco", b"co64"):
+            fmt = "Q" if box_type == b"co64" else "I"
+            (count,) = struct.unpack_from(">I", data, payload + 4)
+            offsets = [shift(o) for o in struct.unpack_from(f">{count}{fmt}", data, payload + 8)]
+            new_type, new_fmt = (b"co64", "Q") if use_co64 or box_type == b"co64" else (b"stco", "I")
+            out += _box(new_type, data[payload:payload + 8] + struct.pack(f">{count}{new_fmt}", *offsets))
+        else:
+            out += _box(box_type, data[payload:box_end])
+    return bytes(out)
+
+
+def _needs_co64(data: bytes, start: int, end: int, shift: Callable[[int], int]) -> bool:
+    for box_type, payload, box_end in iter_boxes(data, start, end):
+        if box_type in _OFFSET_CONTAINERS and _needs_co64(data, payload, box_end, shift):
+            return True
+        if box_type == b"stco":
+            (count,) = struct.unpack_from(">I", data, payload + 4)
+            if count and shift(max(struct.unpack_from(f">{count}I", data, payload + 8))) > 0xFFFFFFFF:
+                return True
+    return False
+
+
+def _relocation(insert_at: int, moov_start: int, moov_size: int, new_moov_size: int) -> Callable[[int], int]:
+    """Map an offset in the original file to the file with ``moov`` moved to ``insert_at``.
+
+    Data before ``insert_at`` stays put, data up to the old ``moov`` moves
+    down by the new ``moov``, and data after the old ``moov`` (a second
+    ``mdat``, say) only by the difference in size.
+    """
+    def shift(offset: int) -> int:
+        if offset < insert_at:
+            return offset
+        if offset < moov_start:
+            return offset + new_moov_size
+        if offset >= moov_start + moov_size:
+            return offset + new_moov_size - moov_size
+        raise Mp4Error("Chunk offset points into moov")
+    return shift
+
+
+def faststart(src: str, dst: str) -> bool:
+    """Write ``src`` to ``dst`` with ``moov`` moved in front of ``mdat``.
+
+    Chunk offsets are remapped to where their data lands, including data in
+    an ``mdat`` after the old ``moov``, and ``stco`` tables are widened to
+    ``co64`` if they would overflow. Media data is copied in chunks, never
+    loaded whole. Returns False, and writes nothing,
+    when the file is already fast-start or is fragmented.
+    """
+    with open(src, "rb") as f:
+        boxes = list(read_top_level_boxes(f))
+        types = [box[0] for box in boxes]
+        if b"moof" in types or b"moov" not in types or b"mdat" not in types:
+            return False
+        moov_i, mdat_i = types.index(b"moov"), types.index(b"mdat")
+        if moov_i < mdat_i:
+            return False
+
+        _, moov_start, moov_header, moov_size = boxes[moov_i]
+        if moov_size > MAX_MOOV_BYTES:
+            raise Mp4Error("moov box is too large")
+        f.seek(moov_start + moov_header)
+        moov = f.read(moov_size - moov_header)
+
+        # Rebuilt offset tables keep their size whatever the values, so the
+        # new moov's size is known before its offsets are.
+        insert_at = boxes[mdat_i][1]
+        use_co64 = False
+        new_moov = _box(b"moov", _shift_chunk_offsets(moov, 0, len(moov), lambda o: o, use_co64))
+        if _needs_co64(moov, 0, len(moov), _relocation(insert_at, moov_start, moov_size, len(new_moov))):
+            use_co64 = True
+            new_moov = _box(b"moov", _shift_chunk_offsets(moov, 0, len(moov), lambda o: o, use_co64))
+        shift = _relocation(insert_at, moov_start, moov_size, len(new_moov))
+        new_moov = _box(b"moov", _shift_chunk_offsets(moov, 0, len(moov), shift, use_co64))
+
+        with open(dst, "wb") as out:
+            for i, (box_type, start, _, size) in enumerate(boxes):
+                if i == mdat_i:
+                    out.write(new_moov)
+                if i == moov_i:
+                    continue
+                f.seek(start)
+                remaining = size
+                while remaining > 0:
+                    chunk = f.read(min(_COPY_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise Mp4Error("Unexpected end of file")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+    return True
+
+
+@mp4_errors
+def faststart_in_place(path: str) -> bool:
+    """Rewrite ``path`` as fast-start and atomically swap it in. Returns True if it changed."""
+    fd, tmp_path = tempfile.mkstemp(prefix=".faststart-", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    try:
+        changed = faststart(path, tmp_path)
+        if changed:
+            os.replace(tmp_path, path)
+        return changed
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+from urllib.parse import quote
+
+from fastapi.responses import FileResponse, Response
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import get_settings
+from app.core.file_table import media_type_for
+
+OFFLOAD_HEADERS = {
+    "x-accel-redirect": "X-Accel-Redirect",
+    "x-sendfile": "X-Sendfile",
+}
+
+
+def offload_mode() -> str | None:
+    """The configured offload header, or None when Python serves file bodies."""
+    mode = get_settings().media_offload.strip().lower()
+    if not mode:
+        return None
+    if mode not in OFFLOAD_HEADERS:
+        raise ValueError(f"MEDIA_OFFLOAD must be one of {sorted(OFFLOAD_HEADERS)}, not {mode!r}")
+    return mode
+
+
+def offload_response(
+    relative_path: str,
+    file_path: str,
+    media_type: str | None = None,
+    headers: dict[str, str] | None = None,
+) -> Response | None:
+    """An empty response telling the proxy to serve ``file_path`` itself.
+
+    ``relative_path`` is the file's path under ``media/``; nginx gets it under
+    ``MEDIA_OFFLOAD_PREFIX`` (an ``internal`` location), X-Sendfile servers get
+    the absolute filesystem path. Range handling is left to the proxy.
+    """
+    mode = offload_mode()
+    if mode is None:
+        return None
+    if mode == "x-accel-redirect":
+        prefix = get_settings().media_offload_prefix.rstrip("/")
+        target = quote(f"{prefix}/{relative_path.lstrip('/')}")
+    else:
+        target = os.path.abspath(file_path)
+    response_headers = dict(headers or {})
+    response_headers[OFFLOAD_HEADERS[mode]] = target
+    return Response(status_code=200, headers=response_headers,
+                    media_type=media_type or media_type_for(file_path))
+
+
+class OffloadStaticFiles(StaticFiles):
+    """``StaticFiles`` that keeps its lookup and 404 handling but hands bodies to the proxy."""
+
+    def file_response(
+        self,
+        full_path: os.PathLike[str] | str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        full_path = os.fspath(full_path)
+        if offload_mode() is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        # Validators come from the stat result, as StaticFiles computes them, so
+        # conditional requests still get a 304 without involving the proxy.
+        validators = FileResponse(full_path, status_code=status_code, stat_result=stat_result).headers
+        if self.is_not_modified(validators, Headers(scope=scope)):
+            return NotModifiedResponse(validators)
+        relative_path = os.path.relpath(full_path, os.path.abspath(self.directory)).replace(os.sep, "/")
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        headers = {name: validators[name] for name in ("etag", "last-modified")}
+        return offload_response(relative_path, full_path, media_type=media_type, headers=headers)
+
+
+def media_static_files(directory: str) -> StaticFiles:
+    if offload_mode() is None:
+        return StaticFiles(directory=directory)
+    return OffloadStaticFiles(directory=directory)
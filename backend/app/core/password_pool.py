@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import get_settings
+from app.core.errors import ServiceUnavailable
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_inflight = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().password_hash_workers, thread_name_prefix="password-hash")
+    return _executor
+
+
+async def run_password_work(fn: Callable[..., T], *args: Any) -> T:
+    """Run an Argon2 hash or verify on the dedicated password pool.
+
+    argon2-cffi releases the GIL, so a few threads hash in parallel without
+    stalling the event loop. Calls beyond ``PASSWORD_HASH_WORKERS`` running
+    plus ``PASSWORD_HASH_MAX_QUEUE`` waiting are refused with 503 rather than
+    queued behind a login burst.
+    """
+    global _inflight
+    settings = get_settings()
+    if _inflight >= settings.password_hash_workers + settings.password_hash_max_queue:
+        metrics.inc("password_hash_rejected_total")
+        raise ServiceUnavailable("Too many sign-ins in progress, please retry")
+    _inflight += 1
+    metrics.inc("password_hash_admitted_total")
+    metrics.set("password_hash_inflight", _inflight)
+    metrics.set_max("password_hash_inflight_max", _inflight)
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args))
+    finally:
+        _inflight -= 1
+        metrics.set("password_hash_inflight", _inflight)
+        metrics.inc("password_hash_seconds_total", time.perf_counter() - started)
+
+
+def shutdown_password_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
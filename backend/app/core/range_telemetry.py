@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import uuid
+from collections import Counter
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+
+class RangeTelemetry:
+    """In-memory counts of served byte ranges, per video and fixed-size bin.
+
+    ``record`` appends one ``(start, length)`` event on the request path,
+    whatever the length; ``drain`` bins the batch for the flush task, which
+    writes it in one statement.
+    """
+
+    def __init__(self, bin_bytes: int) -> None:
+        self.bin_bytes = bin_bytes
+        self._events: dict[uuid.UUID, list[tuple[int, int]]] = {}
+        self._paths: dict[uuid.UUID, str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.bin_bytes > 0
+
+    def record(self, video_id: uuid.UUID, path: str, start: int, length: int) -> None:
+        if not self.enabled or length <= 0:
+            return
+        events = self._events.get(video_id)
+        if events is None:
+            events = self._events[video_id] = []
+            self._paths[video_id] = path
+        events.append((start, length))
+        metrics.inc("range_telemetry_ranges_total")
+
+    def drain(self) -> tuple[dict[uuid.UUID, Counter[int]], dict[uuid.UUID, str]]:
+        """Take everything recorded since the last call, as hits per bin."""
+        events, paths = self._events, self._paths
+        self._events, self._paths = {}, {}
+        return {video_id: self._bin(ranges) for video_id, ranges in events.items()}, paths
+
+    def _bin(self, ranges: list[tuple[int, int]]) -> Counter[int]:
+        # +1 where each range's first bin starts and -1 after its last, then
+        # a running sum over the sorted boundaries gives each bin's hits.
+        deltas: Counter[int] = Counter()
+        for start, length in ranges:
+            deltas[start // self.bin_bytes] += 1
+            deltas[(start + length - 1) // self.bin_bytes + 1] -= 1
+        bins: Counter[int] = Counter()
+        hits = 0
+        boundaries = sorted(deltas)
+        for index, next_index in zip(boundaries, boundaries[1:]):
+            hits += deltas[index]
+            if hits:
+                for covered in range(index, next_index):
+                    bins[covered] = hits
+        return bins
+
+
+_telemetry: RangeTelemetry | None = None
+
+
+def get_range_telemetry() -> RangeTelemetry:
+    global _telemetry
+    if _telemetry is None:
+        settings = get_settings()
+        bin_bytes = settings.media_telemetry_bin_bytes if settings.media_telemetry_flush_seconds > 0 else 0
+        _telemetry = RangeTelemetry(bin_bytes)
+    return _telemetry
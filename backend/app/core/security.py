@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import base64
 import hashlib
+import hmac
 import secrets
+import time
 import uuid
 from datetime import UTC, datetime, timedelta
 
@@ -10,22 +13,49 @@ from passlib.context import CryptContext
 
 from app.core.config import get_settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+_pwd_contexts: dict[tuple[int, int, int], CryptContext] = {}
+
+
+def _pwd_context() -> CryptContext:
+    """The argon2 context for the current settings, built once per parameter set.
+
+    Hashes made with other parameters still verify; ``needs_update`` flags them for rehashing.
+    """
+    settings = get_settings()
+    params = (settings.argon2_time_cost, settings.argon2_memory_cost_kib, settings.argon2_parallelism)
+    context = _pwd_contexts.get(params)
+    if context is None:
+        context = _pwd_contexts[params] = CryptContext(
+            schemes=["argon2"],
+            deprecated="auto",
+            argon2__rounds=params[0],
+            argon2__memory_cost=params[1],
+            argon2__parallelism=params[2],
+        )
+    return context
 
 
 def hash_password(password: str) -> str:
     """Hash password with argon2."""
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Verify password against hash."""
     try:
-        return pwd_context.verify(password, password_hash)
+        return _pwd_context().verify(password, password_hash)
     except ValueError:
         return False
 
 
+def verify_and_update_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """Verify password; also returns a new hash when the stored one uses outdated parameters."""
+    try:
+        return _pwd_context().verify_and_update(password, password_hash)
+    except ValueError:
+        return False, None
+
+
 def _now() -> datetime:
     return datetime.now(UTC)
 
@@ -89,3 +119,63 @@ def decode_jwt(token: str) -> dict:
         return jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
     except JWTError as e:
         raise TokenError("Invalid token") from e
+
+
+def _media_signature(path: str, expires: int) -> str:
+    # Derived key, so a media signature can never double as a JWT signature.
+    key = hashlib.sha256(b"media-url:" + get_settings().jwt_secret_key.encode("utf-8")).digest()
+    digest = hmac.new(key, f"{path}\n{expires}".encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def media_signature_scope(path: str) -> str:
+    """The path a media signature covers.
+
+    An HLS rendition is signed per directory, so one token covers the
+    playlist and every segment it lists.
+    """
+    if path.startswith("/media/hls/"):
+        return path.rsplit("/", 1)[0] + "/"
+    return path
+
+
+# Media kinds served only through signed URLs. Avatars, banners and their
+# variants stay public so their versioned URLs remain stable.
+SIGNED_MEDIA_KINDS = ("videos", "thumbnails", "hls")
+
+
+def is_signed_media_url(url: str) -> bool:
+    """Whether ``url`` is a stream URL or a ``/media/`` URL of a signed kind (or its variant)."""
+    if url.startswith("/api/v1/videos/"):
+        return True
+    if not url.startswith("/media/"):
+        return False
+    parts = url[len("/media/"):].split("/", 2)
+    kind = parts[1] if parts[0] == "variants" and len(parts) > 1 else parts[0]
+    return kind in SIGNED_MEDIA_KINDS
+
+
+def sign_media_url(url: str) -> str:
+    """Append ``exp`` and ``sig`` to a signed-kind media or stream URL when signed URLs are enabled.
+
+    Expiry is rounded up to the next ``MEDIA_URL_TTL_SECONDS`` window, so a
+    file gets the same URL for a whole window and edge caches keep hitting.
+    """
+    settings = get_settings()
+    if not settings.media_signed_urls or not is_signed_media_url(url):
+        return url
+    ttl = settings.media_url_ttl_seconds
+    expires = (int(time.time()) // ttl + 2) * ttl
+    # The signature covers the path only; an existing query (e.g. ``?v=``) is kept.
+    path, sep, _ = url.partition("?")
+    signature = _media_signature(media_signature_scope(path), expires)
+    return f"{url}{'&' if sep else '?'}exp={expires}&sig={signature}"
+
+
+def verify_media_signature(path: str, expires: str | None, signature: str | None) -> bool:
+    """Check a signed media URL in constant time, without any database access."""
+    if not expires or not signature or not expires.isdigit():
+        return False
+    if int(expires) < time.time():
+        return False
+    return hmac.compare_digest(_media_signature(media_signature_scope(path), int(expires)), signature)
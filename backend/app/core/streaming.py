@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import re
-from pathlib import Path
-from typing import BinaryIO, Dict, Optional
+import secrets
+import uuid
+from typing import BinaryIO, Dict, List, Optional, Tuple
 from fastapi import HTTPException, Request
 from fastapi.responses import Response
 from starlette.background import BackgroundTask
@@ -11,6 +13,93 @@ from starlette.convertors import Convertor
 from starlette.datastructures import Headers
 from starlette.types import Receive, Scope, Send
 
+from app.core.config import get_settings
+from app.core.egress import EgressStream, get_egress_scheduler
+from app.core.file_io import advise_sequential, pread
+from app.core.file_table import get_file_table, media_type_for
+from app.core.media_cache import BLOCK_SIZE, get_media_cache
+from app.core.range_telemetry import get_range_telemetry
+
+MAX_RANGES = 16
+# Zero-copy sends are split into pieces of this size when egress is paced.
+PACED_SEND_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def etag_matches(header: str, etag: str, weak: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def if_range_matches(header: Optional[str], etag: str, last_modified: str) -> bool:
+    """A Range header only applies if the If-Range validator still matches."""
+    if header is None:
+        return True
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        return etag_matches(header, etag, weak=False)
+    return header == last_modified
+
+
+def parse_range_header(header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse ``bytes=`` ranges into sorted, coalesced inclusive ``(start, end)`` pairs.
+
+    Returns None when the header is malformed (it is then ignored) and raises
+    RangeNotSatisfiable when none of the ranges overlap the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    parts = spec.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges: List[Tuple[int, int]] = []
+    for part in parts:
+        match = re.fullmatch(r"\s*(\d*)\s*-\s*(\d*)\s*", part)
+        if not match or not any(match.groups()):
+            return None
+        start_str, end_str = match.groups()
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+            if end_str and end < start:
+                return None
+        else:
+            suffix = int(end_str)
+            if suffix == 0:
+                continue
+            start = max(file_size - suffix, 0)
+            end = file_size - 1
+        if start < file_size:
+            ranges.append((start, min(end, file_size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
 
 class StreamingResponseWithRange(Response):
     def __init__(
@@ -20,43 +109,40 @@ class StreamingResponseWithRange(Response):
         headers: Optional[Dict[str, str]] = None,
         media_type: Optional[str] = None,
         background: Optional[BackgroundTask] = None,
+        zero_copy: Optional[bool] = None,
+        duration_seconds: Optional[float] = None,
+        telemetry_id: Optional[uuid.UUID] = None,
     ) -> None:
         self.file_path = file_path
+        self.duration_seconds = duration_seconds
+        self.telemetry_id = telemetry_id
+        self.egress: Optional[EgressStream] = None
+        # Bytes of the range being sent that have been handed to the server.
+        self.range_sent = 0
+        self.zero_copy = get_settings().media_zero_copy if zero_copy is None else zero_copy
+        self.readahead_max = get_settings().media_readahead_max_bytes
+        self.cache = get_media_cache()
+        self.files = get_file_table()
         self.status_code = status_code
         self.background = background
-                self.headers = headers or {}
-        self.headers.setdefault("Accept-Ranges", "bytes")
+        self.response_headers: Dict[str, str] = dict(headers or {})
+        self.response_headers.setdefault("Accept-Ranges", "bytes")
         
-        if media_type is None:
-            file_ext = Path(file_path).suffix.lower()
-            content_types = {
-                ".mp4": "video/mp4",
-                ".webm": "video/webm",
-                ".ogg": "video/ogg",
-                ".mov": "video/quicktime",
-                ".avi": "video/x-msvideo",
-                ".wmv": "video/x-ms-wmv",
-                ".flv": "video/x-flv",
-                ".mkv": "video/x-matroska",
-                ".m3u8": "application/vnd.apple.mpegurl",
-                ".ts": "video/mp2t",
-            }
-            media_type = content_types.get(file_ext, "application/octet-stream")
-        
-        self.media_type = media_type
+        self.media_type = media_type or media_type_for(file_path)
+        self.response_headers.setdefault("Content-Type", self.media_type)
     
-    async def stream_file(self, start: int, end: int, file_size: int) -> tuple[BinaryIO, int, Dict[str, str]]:
+    async def stream_file(
+        self, start: int, end: int, file_size: int, partial: bool = False
+    ) -> tuple[BinaryIO, int, Dict[str, str]]:
         """Stream a portion of the file."""
-        file_handle = open(self.file_path, "rb")
-        
-        file_handle.seek(start)
+        file_handle = await self.files.acquire(self.file_path, self.meta)
         
         content_length = min(end - start + 1, file_size - start)
         
-        response_headers = dict(self.headers)
+        response_headers = dict(self.response_headers)
         response_headers["Content-Length"] = str(content_length)
         
-        if start != 0 or end != file_size - 1:
+        if partial:
             response_headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
         
         return file_handle, content_length, response_headers
@@ -64,53 +150,59 @@ class StreamingResponseWithRange(Response):
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         request = Request(scope)
         
-        if not os.path.exists(self.file_path):
+        try:
+            self.meta = await self.files.stat(self.file_path)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="File not found")
-        
-        file_size = os.path.getsize(self.file_path)
-        
+        file_size = self.meta.size
+        self.cache.validate(self.file_path, self.meta.mtime_ns, file_size)
+
+        etag = self.meta.etag
+        last_modified = self.meta.last_modified
+        self.response_headers["ETag"] = etag
+        self.response_headers["Last-Modified"] = last_modified
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag, weak=True):
+            await self.send_empty(send, 304, {
+                key: value for key, value in self.response_headers.items() if key != "Content-Type"
+            })
+            return
+
+        ranges: Optional[List[Tuple[int, int]]] = None
         range_header = request.headers.get("range")
-        start, end = 0, file_size - 1
-        
-        if range_header:
+        if range_header and if_range_matches(request.headers.get("if-range"), etag, last_modified):
             try:
-                match = re.search(r"bytes=(\d*)-(\d*)", range_header)
-                if match:
-                    start_str, end_str = match.groups()
-                    
-                    if start_str:
-                        start = int(start_str)
-                    
-                    if end_str:
-                        end = int(end_str)
-                    else:
-                        end = file_size - 1
-                    
-                    if start >= file_size:
-                        await send({
-                            "type": "http.response.start",
-                            "status": 416, 
-                            "headers": [
-                                (b"content-range", f"bytes */{file_size}".encode()),
-                            ],
-                        })
-                        await send({
-                            "type": "http.response.body",
-                            "body": b"",
-                            "more_body": False,
-                        })
-                        return
-                    
-                    if end >= file_size:
-                        end = file_size - 1
-                    
-                    self.status_code = 206
-                else:
-                    range_header = None
-            except (ValueError, IndexError):
-                range_header = None
+                ranges = parse_range_header(range_header, file_size)
+            except RangeNotSatisfiable:
+                await self.send_empty(send, 416, {"Content-Range": f"bytes */{file_size}"})
+                return
+
+        if scope["method"] == "HEAD":
+            await self.send_empty(send, self.status_code, {**self.response_headers, "Content-Length": str(file_size)})
+            return
+
+        # The peer address and port identify the connection the request came on.
+        client = scope.get("client")
+        self.egress = get_egress_scheduler().open(
+            f"{client[0]}:{client[1]}" if client else "", self.file_path, file_size, self.duration_seconds)
+        try:
+            await self.send_body(scope, send, ranges, file_size)
+        finally:
+            if self.egress is not None:
+                self.egress.close()
+
+    async def send_body(
+        self, scope: Scope, send: Send, ranges: Optional[List[Tuple[int, int]]], file_size: int
+    ) -> None:
+        if ranges is not None and len(ranges) > 1:
+            await self.send_multipart(scope, send, ranges, file_size)
+            return
+
+        start, end = ranges[0] if ranges else (0, file_size - 1)
+        status_code = 206 if ranges else self.status_code
         
-        file_handle, content_length, response_headers = await self.stream_file(start, end, file_size)
+        file_handle, content_length, response_headers = await self.stream_file(start, end, file_size, partial=bool(ranges))
         
         header_list = []
         for key, value in response_headers.items():
@@ -118,31 +210,209 @@ class StreamingResponseWithRange(Response):
         
         await send({
             "type": "http.response.start",
-            "status": self.status_code,
+            "status": status_code,
             "headers": header_list,
         })
         
+        try:
+            if (
+                self.zero_copy
+                and self.egress is None
+                and "http.response.pathsend" in scope.get("extensions", {})
+                and "http.response.zerocopysend" not in scope.get("extensions", {})
+                and start == 0
+                and content_length == file_size
+            ):
+                await send({
+                    "type": "http.response.pathsend",
+                    "path": os.path.abspath(self.file_path),
+                })
+                self.record_sent(0, file_size)
+            else:
+                await self.send_range(scope, send, file_handle, start, content_length, more_body=False)
+        finally:
+            self.files.release(file_handle)
+            
+            if self.background:
+                await self.background()
+
+    async def send_empty(self, send: Send, status_code: int, headers: Dict[str, str]) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+        })
+        await send({
+            "type": "http.response.body",
+            "body": b"",
+            "more_body": False,
+        })
+
+    async def send_multipart(
+        self, scope: Scope, send: Send, ranges: List[Tuple[int, int]], file_size: int
+    ) -> None:
+        """Send a ``multipart/byteranges`` body (RFC 7233, section 4.1)."""
+        boundary = secrets.token_hex(16)
+        part_headers = [
+            (
+                f"--{boundary}\r\n"
+                f"Content-Type: {self.media_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+            ).encode("latin-1")
+            for start, end in ranges
+        ]
+        closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        content_length = (
+            sum(len(header) for header in part_headers)
+            + sum(end - start + 1 for start, end in ranges)
+            + 2 * (len(ranges) - 1)
+            + len(closing)
+        )
+
+        response_headers = dict(self.response_headers)
+        response_headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+        response_headers["Content-Length"] = str(content_length)
+        await send({
+            "type": "http.response.start",
+            "status": 206,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in response_headers.items()],
+        })
+
+        file_handle = await self.files.acquire(self.file_path, self.meta)
+        try:
+            for i, ((start, end), header) in enumerate(zip(ranges, part_headers)):
+                body = header if i == 0 else b"\r\n" + header
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+                await self.send_range(scope, send, file_handle, start, end - start + 1, more_body=True)
+            await send({"type": "http.response.body", "body": closing, "more_body": False})
+        finally:
+            self.files.release(file_handle)
+
+            if self.background:
+                await self.background()
+
+    async def send_range(
+        self,
+        scope: Scope,
+        send: Send,
+        file_handle: BinaryIO,
+        start: int,
+        content_length: int,
+        more_body: bool,
+    ) -> None:
+        """Send ``content_length`` bytes at ``start`` and record how many actually went out."""
+        self.range_sent = 0
+        try:
+            if self.zero_copy and "http.response.zerocopysend" in scope.get("extensions", {}):
+                piece = content_length if self.egress is None else PACED_SEND_SIZE
+                while True:
+                    count = min(piece, content_length - self.range_sent)
+                    if self.egress is not None:
+                        await self.egress.throttle(count)
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": file_handle,
+                        "offset": start + self.range_sent,
+                        "count": count,
+                        "more_body": more_body or self.range_sent + count < content_length,
+                    })
+                    self.range_sent += count
+                    if self.range_sent >= content_length:
+                        break
+            else:
+                await self.send_chunks(send, file_handle, start, content_length, more_body)
+        finally:
+            # A client that disconnects mid-range is counted for what it got.
+            self.record_sent(start, self.range_sent)
+
+    def record_sent(self, start: int, length: int) -> None:
+        if self.telemetry_id is not None:
+            get_range_telemetry().record(self.telemetry_id, self.file_path, start, length)
+
+    async def read_chunk(self, file_handle: BinaryIO, offset: int, size: int, readahead: int = 0) -> bytes:
+        """Read up to ``size`` bytes at ``offset``.
+
+        A cache hit returns at most the rest of one block; a miss reads every
+        block the request touches in one call. Head blocks and single-block
+        reads (seeks, small ranges) are cached; the larger reads of a
+        sequential stream whose readahead has grown are not, so one long
+        stream cannot evict the heads other requests rely on.
+        """
+        if not self.cache.enabled:
+            return await pread(file_handle, offset, size, readahead)
+
+        index, block_offset = divmod(offset, BLOCK_SIZE)
+        block = self.cache.get(self.file_path, index)
+        if block is None:
+            if self.cache.is_head(index):
+                # Players fetch the head first; load all of it in one read.
+                head = await pread(file_handle, 0, self.cache.head_bytes)
+                for head_offset in range(0, len(head), BLOCK_SIZE):
+                    self.cache.put(self.file_path, head_offset // BLOCK_SIZE,
+                                   head[head_offset:head_offset + BLOCK_SIZE])
+                block = head[index * BLOCK_SIZE:(index + 1) * BLOCK_SIZE]
+            else:
+                blocks = -(-(block_offset + size) // BLOCK_SIZE)
+                data = await pread(file_handle, index * BLOCK_SIZE, blocks * BLOCK_SIZE, readahead)
+                if size > BLOCK_SIZE:
+                    return data[block_offset:block_offset + size]
+                for data_offset in range(0, len(data), BLOCK_SIZE):
+                    self.cache.put(self.file_path, index + data_offset // BLOCK_SIZE,
+                                   data[data_offset:data_offset + BLOCK_SIZE])
+                return data[block_offset:block_offset + size]
+        return block[block_offset:block_offset + size]
+
+    async def send_chunks(
+        self, send: Send, file_handle: BinaryIO, start: int, content_length: int, more_body: bool = False
+    ) -> None:
+        """Copy the range through Python when the server has no zero-copy extension.
+
+        Chunks are aligned to cache blocks and read on the media I/O pool; the
+        next chunk is read while the current one is being sent. While the
+        range keeps being consumed, each read doubles in size up to
+        ``MEDIA_READAHEAD_MAX_BYTES`` and asks the kernel to fetch the one after.
+        """
         sent = 0
-        chunk_size = 65536 
+        chunk_size = BLOCK_SIZE
+        next_read: Optional[asyncio.Future[bytes]] = None
+        if content_length > BLOCK_SIZE and self.readahead_max > BLOCK_SIZE:
+            await advise_sequential(file_handle, start, content_length)
+        if content_length > 0:
+            next_read = asyncio.ensure_future(self.read_chunk(
+                file_handle, start, min(BLOCK_SIZE - start % BLOCK_SIZE, content_length)))
         
         try:
-            while sent < content_length:
-                remaining = content_length - sent
-                current_chunk_size = min(chunk_size, remaining)
-                
-                chunk = file_handle.read(current_chunk_size)
+            while next_read is not None:
+                chunk = await next_read
+                next_read = None
                 if not chunk:
                     break
                 
+                sent += len(chunk)
+                if sent < content_length:
+                    size = min(chunk_size, content_length - sent)
+                    if self.readahead_max > chunk_size:
+                        chunk_size = min(chunk_size * 2, self.readahead_max)
+                    readahead = min(chunk_size, content_length - sent - size) if self.readahead_max else 0
+                    next_read = asyncio.ensure_future(self.read_chunk(
+                        file_handle, start + sent, size, readahead))
+                if self.egress is not None:
+                    await self.egress.throttle(len(chunk))
+                
                 await send({
                     "type": "http.response.body",
                     "body": chunk,
-                    "more_body": sent + len(chunk) < content_length,
+                    "more_body": more_body or sent < content_length,
                 })
-                
-                sent += len(chunk)
+                self.range_sent += len(chunk)
         finally:
-            file_handle.close()
-            
-            if self.background:
-                await self.background()
\ No newline at end of file
+            if next_read is not None:
+                # Let the in-flight read finish before the caller closes the file.
+                await asyncio.gather(next_read, return_exceptions=True)
+
+        if sent == 0 and not more_body:
+            await send({
+                "type": "http.response.body",
+                "body": b"",
+                "more_body": False,
+            })
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO
+
+from fastapi import UploadFile
+
+from app.core.config import get_settings
+from app.core.errors import PayloadTooLarge
+from app.core.file_io import run_io
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+_slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+
+def _write_chunk(out: BinaryIO, chunk: bytes, hasher: hashlib._Hash | None) -> None:
+    if hasher is not None:
+        hasher.update(chunk)
+    out.write(chunk)
+
+
+def upload_slot() -> asyncio.Semaphore:
+    """Semaphore bounding how many uploads are written at once in this worker."""
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(get_settings().max_concurrent_uploads))
+    return _slots[1]
+
+
+async def save_upload(
+    upload: UploadFile, dest_path: str, max_bytes: int, hasher: hashlib._Hash | None = None
+) -> int:
+    """Stream ``upload`` to ``dest_path`` and return the number of bytes written.
+
+    The data goes to a temp file next to the destination, which is renamed
+    into place only once the whole upload has been written. At most
+    ``MAX_CONCURRENT_UPLOADS`` uploads are written at once per worker. If
+    ``hasher`` is given it is fed every chunk as it is written.
+    """
+    async with upload_slot():
+        directory = os.path.dirname(dest_path)
+        await run_io(os.makedirs, directory, 0o777, True)
+        fd, tmp_path = await run_io(tempfile.mkstemp, ".part", ".upload-", directory)
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise PayloadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                    await run_io(_write_chunk, out, chunk, hasher)
+            await run_io(os.replace, tmp_path, dest_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+        return written
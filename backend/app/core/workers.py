@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=get_settings().media_worker_processes)
+    return _process_pool
+
+
+async def run_in_process(fn: Callable[..., T], *args: Any) -> T:
+    """Run CPU-heavy media work (parsing, packaging) in the shared process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_process_pool(), functools.partial(fn, *args))
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -1,18 +1,93 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.media import MediaCacheHeaders, SignedMediaGuard, rescan_user_media, user_media_index
 from app.api.v1_router import v1_router
+from app.api.variants import router as variants_router
 from app.core.config import get_settings
 from app.core.errors import AppError, app_error_handler
+from app.core.egress import get_egress_scheduler
+from app.core.file_io import run_io, shutdown_executor
+from app.core.file_table import get_file_table
+from app.core.metrics import metrics, monitor_event_loop_lag
+from app.core.offload import media_static_files
+from app.core.password_pool import shutdown_password_pool
+from app.core.workers import shutdown_process_pool
 from app.middleware.auth import AuthContextMiddleware
+from app.middleware.upload_limit import UploadSizeLimitMiddleware
+from app.services.hot_media import pin_hot_videos
+from app.services.last_seen import flush_last_seen, get_last_seen_buffer
+from app.services.revocation import sync_revocations
+from app.services.retention import RetentionService, flush_range_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    lag_monitor = asyncio.create_task(
+        monitor_event_loop_lag(settings.event_loop_lag_interval_seconds))
+    await run_io(user_media_index.rebuild)
+    media_rescan = None
+    if settings.user_media_rescan_seconds > 0:
+        media_rescan = asyncio.create_task(
+            rescan_user_media(settings.user_media_rescan_seconds))
+    hot_media = None
+    if settings.media_pin_hot_videos > 0:
+        hot_media = asyncio.create_task(
+            pin_hot_videos(settings.media_pin_hot_videos, settings.media_pin_interval_seconds))
+    range_telemetry = None
+    if settings.media_telemetry_flush_seconds > 0:
+        range_telemetry = asyncio.create_task(
+            flush_range_telemetry(settings.media_telemetry_flush_seconds))
+    last_seen = None
+    if settings.session_last_seen_flush_seconds > 0:
+        last_seen = asyncio.create_task(flush_last_seen(settings.session_last_seen_flush_seconds))
+    revocations = None
+    if settings.auth_stateless_access:
+        revocations = asyncio.create_task(sync_revocations())
+    try:
+        yield
+    finally:
+        lag_monitor.cancel()
+        if media_rescan is not None:
+            media_rescan.cancel()
+        if hot_media is not None:
+            hot_media.cancel()
+        if range_telemetry is not None:
+            range_telemetry.cancel()
+            try:
+                await RetentionService.flush()
+            except Exception:
+                logger.exception("Final range telemetry flush failed")
+        if revocations is not None:
+            revocations.cancel()
+        if last_seen is not None:
+            last_seen.cancel()
+            try:
+                await get_last_seen_buffer().flush()
+            except Exception:
+                logger.exception("Final last_seen_at flush failed")
+        get_file_table().close_all()
+        shutdown_executor()
+        shutdown_process_pool()
+        shutdown_password_pool()
 
 
 def create_app() -> FastAPI:
     settings = get_settings()
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
+    # Inside CORS so browsers can read the 413.
+    app.add_middleware(UploadSizeLimitMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["http://localhost:3000", "http://127.0.0.1:3000",
@@ -20,16 +95,25 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Keyframe-Time", "X-Keyframe-Offset"],
     )
 
     app.add_middleware(AuthContextMiddleware)
     app.add_exception_handler(AppError, app_error_handler)
 
-    from fastapi.staticfiles import StaticFiles
+    import mimetypes
     import os
+    # HLS renditions are served from /media; ".ts" otherwise maps to a text type.
+    mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+    mimetypes.add_type("video/mp2t", ".ts")
     media_dir = os.path.abspath(os.path.join(
         os.path.dirname(__file__), '../media'))
-    app.mount("/media", StaticFiles(directory=media_dir), name="media")
+    media_app = MediaCacheHeaders(media_static_files(media_dir))
+    if settings.media_signed_urls:
+        media_app = SignedMediaGuard(media_app)
+    # Registered before the mount so /media/variants/* reaches the lazy renderer.
+    app.include_router(variants_router)
+    app.mount("/media", media_app, name="media")
 
     app.include_router(v1_router)
 
@@ -37,6 +121,10 @@ def create_app() -> FastAPI:
     async def healthz() -> dict:
         return {"ok": True, "status": "healthy"}
 
+    @app.get("/metrics")
+    async def metrics_snapshot() -> dict:
+        return {**metrics.snapshot(), "egress": get_egress_scheduler().snapshot()}
+
     @app.get("/")
     async def root() -> dict:
         return {
@@ -1,60 +1,101 @@
 from __future__ import annotations
 
 import uuid
+from dataclasses import dataclass
 from datetime import UTC, datetime
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
 from sqlalchemy import select
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.config import get_settings
 from app.core.security import TokenError, decode_jwt, sha256_hex
 from app.db.database import AsyncSessionLocal
 from app.models.session import Session
 from app.models.user import User
+from app.services.last_seen import get_last_seen_buffer
+from app.services.revocation import get_revocation_filter
+from app.services.session_cache import get_session_cache
 
 
 def _now() -> datetime:
     return datetime.now(UTC)
 
 
-class AuthContextMiddleware(BaseHTTPMiddleware):
-
-    async def dispatch(self, request: Request, call_next) -> Response:
-        settings = get_settings()
-        request.state.user = None
-        request.state.user_id = None
-        request.state.session_id = None
-
-        access = request.cookies.get(settings.cookie_access_name)
-        session_token = request.cookies.get(settings.cookie_session_name)
-        if not access or not session_token:
-            return await call_next(request)
-
-        try:
-            claims = decode_jwt(access)
-        except TokenError:
-            return await call_next(request)
-
-        if claims.get("typ") != "access":
-            return await call_next(request)
-
-        sub = claims.get("sub")
-        sid = claims.get("sid")
-        if not sub or not sid:
-            return await call_next(request)
-
-        try:
-            user_id = uuid.UUID(str(sub))
-            session_id = uuid.UUID(str(sid))
-        except ValueError:
-            return await call_next(request)
-
-        async with AsyncSessionLocal() as db:
-            now = _now()
-            token_hash = sha256_hex(session_token)
-
+@dataclass(frozen=True)
+class AuthCookies:
+    access: str
+    session_token: str
+
+
+class AuthContextMiddleware:
+    """Puts the auth cookies of a request on ``request.state.auth``.
+
+    Nothing is verified or loaded here: ``get_request_user`` does that on
+    first use, so routes that never look at the user cost no token or
+    database work, and response bodies pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            state = scope.setdefault("state", {})
+            state["auth"] = None
+            cookie = Headers(scope=scope).get("cookie")
+            if cookie:
+                settings = get_settings()
+                cookies = cookie_parser(cookie)
+                access = cookies.get(settings.cookie_access_name)
+                session_token = cookies.get(settings.cookie_session_name)
+                if access and session_token:
+                    state["auth"] = AuthCookies(access, session_token)
+        await self.app(scope, receive, send)
+
+
+async def load_session_user(cookies: AuthCookies) -> tuple[User, uuid.UUID] | None:
+    """Validate the access token and session cookie; ``(user, session_id)`` or None."""
+    try:
+        claims = decode_jwt(cookies.access)
+    except TokenError:
+        return None
+
+    if claims.get("typ") != "access":
+        return None
+
+    sub = claims.get("sub")
+    sid = claims.get("sid")
+    if not sub or not sid:
+        return None
+
+    try:
+        user_id = uuid.UUID(str(sub))
+        session_id = uuid.UUID(str(sid))
+    except ValueError:
+        return None
+
+    # Stateless mode trusts the token until it expires unless the session
+    # was revoked, so the sessions table is only read while the filter is
+    # still loading.
+    revocations = get_revocation_filter()
+    stateless = get_settings().auth_stateless_access and revocations.ready
+    if stateless and revocations.is_revoked(session_id):
+        return None
+
+    token_hash = sha256_hex(cookies.session_token)
+    cache = get_session_cache()
+    user = cache.get(session_id, token_hash, user_id)
+    if user is not None:
+        get_last_seen_buffer().touch(session_id, _now())
+        return user, session_id
+
+    async with AsyncSessionLocal() as db:
+        now = _now()
+
+        session = None
+        if not stateless:
             session = await db.scalar(
                 select(Session).where(
                     Session.id == session_id,
@@ -64,17 +105,19 @@ class AuthContextMiddleware(BaseHTTPMiddleware):
                 )
             )
             if session is None:
-                return await call_next(request)
-
-            user = await db.scalar(select(User).where(User.id == user_id, User.is_active.is_(True)))
-            if user is None:
-                return await call_next(request)
-
-            session.last_seen_at = now
-            await db.commit()
-
-            request.state.user = user
-            request.state.user_id = user.id
-            request.state.session_id = session_id
-
-        return await call_next(request)
+                return None
+
+        user = await db.scalar(select(User).where(User.id == user_id, User.is_active.is_(True)))
+        if user is None:
+            return None
+
+    if session is None:
+        token_expires_at = datetime.fromtimestamp(claims["exp"], UTC)
+        get_last_seen_buffer().touch(session_id, now)
+        # The token and the revocation filter decide validity; the cached user
+        # snapshot still expires after AUTH_CACHE_TTL_SECONDS like any other.
+        cache.put(session_id, token_hash, user, token_expires_at)
+    else:
+        get_last_seen_buffer().touch(session_id, now, session.last_seen_at)
+        cache.put(session_id, token_hash, user, session.expires_at)
+    return user, session_id
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.errors import PayloadTooLarge, app_error_handler
+
+# Room for the form's text fields and multipart boundaries on top of the files.
+FORM_OVERHEAD_BYTES = 1024 * 1024
+VIDEO_FORM_PATHS = frozenset({"/api/v1/videos", "/api/v1/videos/"})
+
+
+def multipart_limit(path: str) -> int:
+    """Largest multipart body accepted on ``path``: a video plus thumbnail, or one image."""
+    settings = get_settings()
+    limit = settings.max_image_upload_bytes + FORM_OVERHEAD_BYTES
+    if path in VIDEO_FORM_PATHS:
+        limit += settings.max_video_upload_bytes
+    return limit
+
+
+class UploadSizeLimitMiddleware:
+    """Refuses oversized multipart bodies before Starlette spools them to disk.
+
+    A ``Content-Length`` over the limit is answered with 413 without reading
+    the body. Chunked bodies are counted as they are received and the
+    request is answered with 413 as soon as they pass the limit. ``save_upload``
+    still checks each file against its own limit.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = multipart_limit(scope["path"])
+        length = headers.get("content-length", "")
+        if length.isdigit() and int(length) > limit:
+            await self.reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Stop the parser here; the app's error response is replaced below.
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal started
+            if exceeded:
+                if not started:
+                    started = True
+                    await self.reject(scope, receive, send, limit)
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self.reject(scope, receive, send, limit)
+
+    async def reject(self, scope: Scope, receive: Receive, send: Send, limit: int) -> None:
+        response = await app_error_handler(None, PayloadTooLarge(f"Upload exceeds {limit} bytes"))
+        response.headers["Connection"] = "close"
+        await response(scope, receive, send)
@@ -1,5 +1,6 @@
 from app.models.base import Base
 from app.models.comment import Comment
+from app.models.media_blob import MediaBlob
 from app.models.refresh_token import RefreshToken
 from app.models.session import Session
 from app.models.subscription import Subscription
@@ -7,6 +8,7 @@ from app.models.user import User
 from app.models.video import Video
 from app.models.video_view import VideoView
 from app.models.video_reaction import VideoReaction
+from app.models.video_range_bin import VideoRangeBin
 
 __all__ = ["Base", "User", "Session", "RefreshToken",
-           "Video", "Comment", "Subscription", "VideoView", "VideoReaction"]
+           "Video", "Comment", "Subscription", "VideoView", "VideoReaction", "MediaBlob", "VideoRangeBin"]
@@ -3,8 +3,8 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Index, Integer, String, Text, func
-from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy import DateTime, Float, Index, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import ForeignKey
 
@@ -28,6 +28,16 @@ class Video(Base):
     duration: Mapped[str] = mapped_column(
         String(32), nullable=False, default="")
 
+    duration_seconds: Mapped[float | None] = mapped_column(
+        Float, nullable=True)
+    width: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    height: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    video_codec: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    audio_codec: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    keyframe_index: Mapped[list[list[float]] | None] = mapped_column(
+        JSONB, nullable=True)
+    hls_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
+
     tags: Mapped[list[str]] = mapped_column(
         ARRAY(String(50)), nullable=False, server_default="{}")
 
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class VideoRangeBin(Base):
+    """How often one fixed-size byte bin of a video file was served."""
+
+    __tablename__ = "video_range_bins"
+
+    video_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    bin: Mapped[int] = mapped_column(Integer, primary_key=True)
+    hits: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0")
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(
+        timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
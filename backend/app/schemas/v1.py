@@ -10,7 +10,9 @@ class V1User(BaseModel):
     id: str
     username: str
     avatar: str = ""
+    avatarSrcset: dict[str, str] = Field(default_factory=dict)
     banner: str = ""
+    bannerSrcset: dict[str, str] = Field(default_factory=dict)
     subscribers: int = 0
 
 
@@ -19,17 +21,35 @@ class V1Video(BaseModel):
     title: str
     description: str
     thumbnail: str
+    thumbnailSrcset: dict[str, str] = Field(default_factory=dict)
     url: str
+    streamUrl: str | None = None
     views: int
     likes: int = 0
     dislikes: int = 0
     uploadedAt: str
     duration: str
+    durationSeconds: float | None = None
+    width: int | None = None
+    height: int | None = None
+    hlsUrl: str | None = None
     uploader: V1User
     tags: list[str] = Field(default_factory=list)
     viewerReaction: str | None = None
 
 
+class V1HeatmapBin(BaseModel):
+    offset: int
+    hits: int
+    startSeconds: float | None = None
+
+
+class V1Heatmap(BaseModel):
+    videoId: str
+    binBytes: int
+    bins: list[V1HeatmapBin] = Field(default_factory=list)
+
+
 class V1Comment(BaseModel):
     id: str
     userId: str
@@ -8,17 +8,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.errors import AuthInvalid, Conflict
+from app.core.password_pool import run_password_work
 from app.core.security import (
     create_access_token,
     create_refresh_token,
     hash_password,
     new_session_token,
     sha256_hex,
-    verify_password,
+    verify_and_update_password,
 )
 from app.models.refresh_token import RefreshToken
 from app.models.session import Session
 from app.models.user import User
+from app.services.revocation import publish_revocations
 
 
 def _now() -> datetime:
@@ -34,7 +36,7 @@ class AuthService:
 
         user = User(
             email=email,
-            password_hash=hash_password(password),
+            password_hash=await run_password_work(hash_password, password),
             display_name=display_name,
             username=f"user_{uuid.uuid4().hex[:10]}",
         )
@@ -47,8 +49,11 @@ class AuthService:
         user = await db.scalar(select(User).where(User.email == email))
         if user is None or not user.is_active:
             raise AuthInvalid("Invalid email or password")
-        if not verify_password(password, user.password_hash):
+        valid, new_hash = await run_password_work(verify_and_update_password, password, user.password_hash)
+        if not valid:
             raise AuthInvalid("Invalid email or password")
+        if new_hash is not None:
+            user.password_hash = new_hash
         return user
 
     @staticmethod
@@ -86,6 +91,7 @@ class AuthService:
 
     @staticmethod
     async def revoke_session(db: AsyncSession, *, session_id: uuid.UUID) -> None:
+        """Revoke the session and its refresh tokens. Commits ``db``."""
         now = _now()
         await db.execute(
             update(Session)
@@ -97,6 +103,7 @@ class AuthService:
             .where(RefreshToken.session_id == session_id, RefreshToken.revoked_at.is_(None))
             .values(revoked_at=now)
         )
+        await publish_revocations(db, [session_id])
 
     @staticmethod
     async def rotate_refresh(
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from fastapi import UploadFile
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.file_io import run_io
+from app.core.file_table import invalidate_media_file
+from app.core.hls import PLAYLIST_NAME
+from app.core.mp4 import Mp4Error, faststart_in_place
+from app.core.uploads import save_upload
+from app.core.workers import run_in_process
+from app.models.media_blob import MediaBlob
+
+logger = logging.getLogger(__name__)
+
+BLOB_KINDS = ("videos", "thumbnails")
+_STAGING = ".staging"
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _media_root() -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "media"))
+
+
+def _safe_ext(filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,8}", ext) else ""
+
+
+def _blob_url(kind: str, digest: str, ext: str) -> str:
+    return f"/media/{kind}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def _url_to_path(url: str) -> str:
+    return os.path.join(_media_root(), *url[len("/media/"):].split("/"))
+
+
+def hls_location(video_path: str) -> tuple[str, str]:
+    """Directory and playlist URL of the HLS rendition packaged from ``video_path``."""
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(_media_root(), "hls", stem), f"/media/hls/{stem}/{PLAYLIST_NAME}"
+
+
+def _staging_path(kind: str) -> str:
+    directory = os.path.join(_media_root(), kind, _STAGING)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, uuid.uuid4().hex)
+
+
+def _hash_file(path: str) -> tuple[str, int]:
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+async def _faststart_staged(staging_path: str) -> bool:
+    """Move ``moov`` in front of ``mdat`` in a staged video. Returns True if it changed.
+
+    Runs before the blob is hashed and committed, so stored blobs are never
+    rewritten and their hash always matches their bytes.
+    """
+    try:
+        return await run_in_process(faststart_in_place, staging_path)
+    except (Mp4Error, OSError) as e:
+        logger.info("Faststart skipped %s: %s", os.path.basename(staging_path), e)
+        return False
+
+
+def _commit_blob(staging_path: str, final_path: str) -> None:
+    """Move a staged file into place, or drop it if the same content is already stored."""
+    if os.path.exists(final_path):
+        # Refresh mtime so a concurrent GC pass treats the blob as live.
+        os.utime(final_path)
+        os.unlink(staging_path)
+        return
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(staging_path, final_path)
+
+
+def _unlink_if_older(path: str, cutoff: float) -> bool:
+    try:
+        if os.path.getmtime(path) >= cutoff:
+            return False
+        os.unlink(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _list_shard_files(kind: str) -> list[tuple[str, list[str]]]:
+    """Return ``(directory, filenames)`` for every leaf shard directory of ``kind``."""
+    root = os.path.join(_media_root(), kind)
+    shards: list[tuple[str, list[str]]] = []
+    if not os.path.isdir(root):
+        return shards
+    for first in os.listdir(root):
+        first_dir = os.path.join(root, first)
+        if len(first) != 2 or not os.path.isdir(first_dir):
+            continue
+        for second in os.listdir(first_dir):
+            second_dir = os.path.join(first_dir, second)
+            if os.path.isdir(second_dir):
+                shards.append((second_dir, os.listdir(second_dir)))
+    return shards
+
+
+class BlobStore:
+    """Content-addressed storage for uploaded videos and thumbnails.
+
+    Files live at ``media/{kind}/{h[0:2]}/{h[2:4]}/{sha256}{ext}``. The
+    ``media_blobs`` table counts how many ``Video`` rows point at each file,
+    and ``collect_garbage`` removes blobs nothing references.
+    """
+
+    @staticmethod
+    async def store_upload(db: AsyncSession, upload: UploadFile, *, kind: str, max_bytes: int) -> str:
+        staging_path = await run_io(_staging_path, kind)
+        hasher = hashlib.sha256()
+        size = await save_upload(upload, staging_path, max_bytes, hasher)
+        digest = hasher.hexdigest()
+        if kind == "videos" and await _faststart_staged(staging_path):
+            digest, size = await run_io(_hash_file, staging_path)
+        return await BlobStore._commit(db, staging_path, kind=kind, digest=digest,
+                                       size=size, ext=_safe_ext(upload.filename))
+
+    @staticmethod
+    async def store_file(db: AsyncSession, path: str, *, kind: str, filename: str) -> str:
+        """Hash an already-written file (e.g. a finished resumable upload) and move it into the store."""
+        staging_path = await run_io(_staging_path, kind)
+        # Upload sessions may live on another filesystem than media/.
+        await run_io(shutil.move, path, staging_path)
+        if kind == "videos":
+            await _faststart_staged(staging_path)
+        digest, size = await run_io(_hash_file, staging_path)
+        return await BlobStore._commit(db, staging_path, kind=kind, digest=digest,
+                                       size=size, ext=_safe_ext(filename))
+
+    @staticmethod
+    async def _commit(db: AsyncSession, staging_path: str, *, kind: str, digest: str, size: int, ext: str) -> str:
+        url = _blob_url(kind, digest, ext)
+        await run_io(_commit_blob, staging_path, _url_to_path(url))
+        invalidate_media_file(_url_to_path(url))
+        await db.execute(
+            insert(MediaBlob)
+            .values(path=url, sha256=digest, size=size)
+            .on_conflict_do_update(index_elements=[MediaBlob.path], set_={"updated_at": func.now()})
+        )
+        return url
+
+    @staticmethod
+    async def add_ref(db: AsyncSession, url: str) -> None:
+        if url:
+            await db.execute(
+                update(MediaBlob)
+                .where(MediaBlob.path == url)
+                .values(ref_count=MediaBlob.ref_count + 1)
+            )
+
+    @staticmethod
+    async def release(db: AsyncSession, url: str) -> None:
+        if url:
+            await db.execute(
+                update(MediaBlob)
+                .where(MediaBlob.path == url, MediaBlob.ref_count > 0)
+                .values(ref_count=MediaBlob.ref_count - 1)
+            )
+
+    @staticmethod
+    async def collect_garbage(db: AsyncSession, *, grace_seconds: int) -> int:
+        """Delete unreferenced blobs and orphaned files older than ``grace_seconds``.
+
+        Returns the number of files removed.
+        """
+        cutoff = time.time() - grace_seconds
+        removed = 0
+
+        urls = (
+            await db.execute(
+                delete(MediaBlob)
+                .where(
+                    MediaBlob.ref_count <= 0,
+                    MediaBlob.updated_at < datetime.now(UTC) - timedelta(seconds=grace_seconds),
+                )
+                .returning(MediaBlob.path)
+            )
+        ).scalars().all()
+        await db.commit()
+        for url in urls:
+            path = _url_to_path(url)
+            if await run_io(_unlink_if_older, path, cutoff):
+                invalidate_media_file(path)
+                removed += 1
+                if url.startswith("/media/videos/"):
+                    await run_io(shutil.rmtree, hls_location(path)[0], True)
+                elif url.startswith("/media/thumbnails/"):
+                    await run_io(shutil.rmtree, _url_to_path(f"/media/variants{url[len('/media'):]}"), True)
+
+        for kind in BLOB_KINDS:
+            for directory, filenames in await run_io(_list_shard_files, kind):
+                if not filenames:
+                    continue
+                relative = os.path.relpath(directory, _media_root()).replace(os.sep, "/")
+                candidates = [f"/media/{relative}/{name}" for name in filenames]
+                known = set(
+                    (await db.execute(select(MediaBlob.path).where(MediaBlob.path.in_(candidates)))).scalars().all()
+                )
+                for url in candidates:
+                    if url not in known and await run_io(_unlink_if_older, _url_to_path(url), cutoff):
+                        invalidate_media_file(_url_to_path(url))
+                        removed += 1
+
+            staging_dir = os.path.join(_media_root(), kind, _STAGING)
+            if os.path.isdir(staging_dir):
+                for name in await run_io(os.listdir, staging_dir):
+                    removed += await run_io(_unlink_if_older, os.path.join(staging_dir, name), cutoff)
+
+        return removed
+
+
+async def _main() -> None:
+    from app.db.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        removed = await BlobStore.collect_garbage(db, grace_seconds=get_settings().media_gc_grace_seconds)
+    print(f"removed {removed} unreferenced media files")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+
+from sqlalchemy import select
+
+from app.api.media import resolve_media_path
+from app.core.file_io import advise, run_io
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal
+from app.models.video import Video
+
+logger = logging.getLogger(__name__)
+
+
+def _will_need(path: str, offset: int = 0, length: int = 0) -> bool:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        # A length of 0 covers the rest of the file.
+        advise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+async def warm_hot_videos(count: int) -> int:
+    """Ask the kernel to load the ``count`` most-viewed videos into the page cache."""
+    async with AsyncSessionLocal() as db:
+        urls = (
+            await db.execute(
+                select(Video.video_url)
+                .where(Video.video_url != "")
+                .order_by(Video.views_count.desc())
+                .limit(count)
+            )
+        ).scalars().all()
+
+    warmed = 0
+    for url in urls:
+        path = resolve_media_path(url)
+        if path is not None and await run_io(_will_need, path):
+            warmed += 1
+    metrics.set("media_pinned_videos", warmed)
+    return warmed
+
+
+async def pin_hot_videos(count: int, interval: float) -> None:
+    """Re-issue the hint every ``interval`` seconds so evicted pages come back."""
+    if not hasattr(os, "POSIX_FADV_WILLNEED"):
+        logger.info("posix_fadvise is not available; not pinning hot videos")
+        return
+    while True:
+        try:
+            await warm_hot_videos(count)
+        except Exception:
+            logger.exception("Warming hot videos failed")
+        await asyncio.sleep(interval)
+
+
+async def warm_ranges(ranges: list[tuple[str, int, int]]) -> None:
+    """Hint ``(path, offset, length)`` ranges into the page cache, e.g. the most-watched parts of videos."""
+    if not hasattr(os, "POSIX_FADV_WILLNEED"):
+        return
+    for path, offset, length in ranges:
+        await run_io(_will_need, path, offset, length)
+    metrics.inc("media_prewarmed_ranges_total", len(ranges))
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+
+from app.api.media import resolve_media_path
+from app.core.file_io import run_io
+from app.core.images import VARIANT_FORMATS, VARIANT_WIDTHS, ImageError, render_variant, render_variants
+from app.core.security import sign_media_url
+from app.core.workers import run_in_process
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_PREFIX = "/media/variants/"
+
+_rendering: dict[str, asyncio.Future[str]] = {}
+
+
+def _split(source_url: str) -> tuple[str, str, str] | None:
+    """``(folder, path under media/, query)`` of a local image URL with variants."""
+    if not source_url or not source_url.startswith("/media/"):
+        return None
+    path, _, query = source_url.partition("?")
+    relative = path[len("/media/"):]
+    folder = relative.split("/", 1)[0]
+    if folder not in VARIANT_WIDTHS:
+        return None
+    return folder, relative, query
+
+
+def variant_url(source_url: str, width: int, fmt: str) -> str:
+    """URL of one variant: ``/media/variants/{source path}/{width}.{fmt}``, keeping ``?v=``."""
+    folder, relative, query = _split(source_url) or ("", "", "")
+    url = f"{VARIANTS_PREFIX}{relative}/{width}.{fmt}"
+    # Strip exp/sig of a signed source; the variant is signed on its own.
+    version = next((p for p in query.split("&") if p.startswith("v=")), "")
+    return sign_media_url(f"{url}?{version}" if version else url)
+
+
+def srcset(source_url: str) -> dict[str, str]:
+    """``{format: "url 160w, url 320w, ..."}`` for a thumbnail, avatar or banner URL."""
+    parts = _split(source_url)
+    if parts is None:
+        return {}
+    widths = VARIANT_WIDTHS[parts[0]]
+    return {
+        fmt: ", ".join(f"{variant_url(source_url, width, fmt)} {width}w" for width in widths)
+        for fmt in VARIANT_FORMATS
+    }
+
+
+def variants_dir(source_url: str) -> str | None:
+    parts = _split(source_url)
+    return resolve_media_path(f"{VARIANTS_PREFIX}{parts[1]}") if parts else None
+
+
+async def render_once(src_path: str, dst_path: str, width: int, fmt: str) -> str:
+    """Render one variant in the process pool, sharing the work between concurrent requests."""
+    pending = _rendering.get(dst_path)
+    if pending is None:
+        pending = asyncio.ensure_future(run_in_process(render_variant, src_path, dst_path, width, fmt))
+        _rendering[dst_path] = pending
+        pending.add_done_callback(lambda _: _rendering.pop(dst_path, None))
+    return await asyncio.shield(pending)
+
+
+async def generate_variants(source_url: str) -> None:
+    """Background task after an upload: render every variant of ``source_url`` ahead of use."""
+    parts = _split(source_url)
+    src_path = resolve_media_path(source_url.partition("?")[0])
+    out_dir = variants_dir(source_url)
+    if parts is None or src_path is None or out_dir is None:
+        return
+    variants = [
+        (os.path.join(out_dir, f"{width}.{fmt}"), width, fmt)
+        for width in VARIANT_WIDTHS[parts[0]]
+        for fmt in VARIANT_FORMATS
+    ]
+    try:
+        written = await run_in_process(render_variants, src_path, variants)
+    except (ImageError, OSError) as e:
+        logger.info("Image variants skipped for %s: %s", source_url, e)
+        return
+    logger.info("Rendered %d image variants for %s", written, source_url)
+
+
+async def remove_variants(source_url: str) -> None:
+    out_dir = variants_dir(source_url)
+    if out_dir is not None:
+        await run_io(shutil.rmtree, out_dir, True)
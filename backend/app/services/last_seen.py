@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, column, or_, update, values
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal
+from app.models.session import Session
+
+logger = logging.getLogger(__name__)
+
+# Two bind parameters per row; stays well under asyncpg's 32767 limit.
+_FLUSH_BATCH_ROWS = 10000
+
+
+class LastSeenBuffer:
+    """Write-behind buffer for ``sessions.last_seen_at``.
+
+    ``touch`` only records the timestamp in memory; ``flush`` writes every
+    pending session in one ``UPDATE ... FROM (VALUES ...)`` per batch.
+    A session whose last written value is less than ``granularity`` old is
+    not written again, so a busy session costs one row update per window.
+    """
+
+    def __init__(self, granularity: float, enabled: bool = True) -> None:
+        self.granularity = timedelta(seconds=granularity)
+        self.enabled = enabled
+        self._pending: dict[uuid.UUID, datetime] = {}
+        self._written: dict[uuid.UUID, datetime] = {}
+
+    def touch(self, session_id: uuid.UUID, seen_at: datetime, stored: datetime | None = None) -> None:
+        """Record a request at ``seen_at``; ``stored`` is the row's value when the caller has it."""
+        if not self.enabled:
+            return
+        if session_id in self._pending:
+            self._pending[session_id] = seen_at
+            return
+        last = self._written.get(session_id) or stored
+        if last is not None and seen_at - last < self.granularity:
+            if stored is not None:
+                self._written.setdefault(session_id, stored)
+            return
+        self._pending[session_id] = seen_at
+
+    async def flush(self) -> int:
+        """Write the pending timestamps; returns the number of sessions written."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        rows = list(pending.items())
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(rows), _FLUSH_BATCH_ROWS):
+                    seen = values(
+                        column("id", UUID(as_uuid=True)),
+                        column("seen_at", DateTime(timezone=True)),
+                        name="seen",
+                    ).data(rows[start:start + _FLUSH_BATCH_ROWS])
+                    await db.execute(
+                        update(Session)
+                        .where(Session.id == seen.c.id)
+                        .where(or_(Session.last_seen_at.is_(None), Session.last_seen_at < seen.c.seen_at))
+                        .values(last_seen_at=seen.c.seen_at)
+                    )
+                await db.commit()
+        except Exception:
+            # Put the batch back (newer touches win) so the next flush retries it.
+            for session_id, seen_at in pending.items():
+                self._pending.setdefault(session_id, seen_at)
+            raise
+
+        # Only the current window matters for skipping; older marks are dropped.
+        newest = max(pending.values())
+        self._written = {
+            session_id: seen_at for session_id, seen_at in self._written.items()
+            if newest - seen_at < self.granularity
+        }
+        self._written.update(pending)
+        metrics.inc("session_last_seen_flushed_total", len(rows))
+        return len(rows)
+
+
+_buffer: LastSeenBuffer | None = None
+
+
+def get_last_seen_buffer() -> LastSeenBuffer:
+    global _buffer
+    if _buffer is None:
+        settings = get_settings()
+        _buffer = LastSeenBuffer(
+            settings.session_last_seen_granularity_seconds,
+            enabled=settings.session_last_seen_flush_seconds > 0,
+        )
+    return _buffer
+
+
+async def flush_last_seen(interval: float) -> None:
+    buffer = get_last_seen_buffer()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await buffer.flush()
+        except Exception:
+            logger.exception("Flushing session last_seen_at failed")
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+
+from sqlalchemy import func, update
+
+from app.core.config import get_settings
+from app.core.file_io import run_io
+from app.core.hls import PLAYLIST_NAME, package_hls
+from app.core.mp4 import Mp4Error, format_duration, probe_mp4
+from app.core.workers import run_in_process
+from app.db.database import AsyncSessionLocal
+from app.models.video import Video
+from app.services.blob_store import hls_location
+
+logger = logging.getLogger(__name__)
+
+
+async def process_video(video_id: uuid.UUID, file_path: str) -> None:
+    """Post-upload stages for a new video, run in order in the process pool.
+
+    The stored blob is only read; faststart already ran on the staged upload
+    (see ``BlobStore``) before it was hashed.
+    """
+    await probe_video(video_id, file_path)
+    await package_video(video_id, file_path)
+
+
+async def probe_video(video_id: uuid.UUID, file_path: str) -> None:
+    """Parse an uploaded video in the process pool and store what it finds on the row."""
+    try:
+        info = await run_in_process(probe_mp4, file_path)
+    except (Mp4Error, OSError) as e:
+        logger.info("Media probe skipped video=%s: %s", video_id, e)
+        return
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Video)
+            .where(Video.id == video_id)
+            .values(
+                duration_seconds=info.duration_seconds,
+                width=info.width,
+                height=info.height,
+                video_codec=info.video_codec,
+                audio_codec=info.audio_codec,
+                keyframe_index=[list(k) for k in info.keyframes],
+                duration=func.coalesce(func.nullif(Video.duration, ""),
+                                       format_duration(info.duration_seconds)),
+            )
+        )
+        await db.commit()
+
+
+async def package_video(video_id: uuid.UUID, file_path: str) -> None:
+    """Remux the video into HLS segments cut at its keyframes and record the playlist URL."""
+    segment_seconds = get_settings().hls_segment_seconds
+    if segment_seconds <= 0:
+        return
+    out_dir, hls_url = hls_location(file_path)
+    # Deduplicated uploads share a blob, and therefore its rendition.
+    if not await run_io(os.path.exists, os.path.join(out_dir, PLAYLIST_NAME)):
+        try:
+            segments = await run_in_process(package_hls, file_path, out_dir, segment_seconds)
+        except (Mp4Error, OSError) as e:
+            logger.info("HLS packaging skipped video=%s: %s", video_id, e)
+            return
+        logger.info("HLS packaged video=%s into %d segments", video_id, segments)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Video).where(Video.id == video_id).values(hls_url=hls_url))
+        await db.commit()
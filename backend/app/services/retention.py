@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.range_telemetry import get_range_telemetry
+from app.db.database import AsyncSessionLocal
+from app.models.video import Video
+from app.models.video_range_bin import VideoRangeBin
+from app.services.hot_media import warm_ranges
+
+logger = logging.getLogger(__name__)
+
+# Three bind parameters per row; stays well under asyncpg's 32767 limit.
+_FLUSH_BATCH_ROWS = 5000
+
+
+class RetentionService:
+    @staticmethod
+    async def flush() -> int:
+        """Write the bins recorded since the last flush and pre-warm the hottest ones.
+
+        Returns the number of bins written.
+        """
+        telemetry = get_range_telemetry()
+        bins, paths = telemetry.drain()
+        if not bins:
+            return 0
+
+        async with AsyncSessionLocal() as db:
+            # Videos deleted since their bins were recorded would fail the
+            # whole batch on the foreign key, so their bins are dropped here.
+            live: set[uuid.UUID] = set()
+            video_ids = list(bins)
+            for start in range(0, len(video_ids), _FLUSH_BATCH_ROWS):
+                result = await db.execute(
+                    select(Video.id).where(Video.id.in_(video_ids[start:start + _FLUSH_BATCH_ROWS]))
+                )
+                live.update(result.scalars())
+            bins = {video_id: counts for video_id, counts in bins.items() if video_id in live}
+            rows = [
+                {"video_id": video_id, "bin": index, "hits": hits}
+                for video_id, counts in bins.items()
+                for index, hits in counts.items()
+            ]
+            for start in range(0, len(rows), _FLUSH_BATCH_ROWS):
+                stmt = insert(VideoRangeBin).values(rows[start:start + _FLUSH_BATCH_ROWS])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[VideoRangeBin.video_id, VideoRangeBin.bin],
+                    set_={"hits": VideoRangeBin.hits + stmt.excluded.hits, "updated_at": func.now()},
+                )
+                try:
+                    await db.execute(stmt)
+                    await db.commit()
+                except IntegrityError:
+                    # A video was deleted between the check above and the insert.
+                    await db.rollback()
+                    logger.info("Dropped range telemetry batch for a deleted video")
+        metrics.inc("range_telemetry_bins_flushed_total", len(rows))
+
+        hottest = heapq.nlargest(
+            get_settings().media_prewarm_bins,
+            ((hits, video_id, index) for video_id, counts in bins.items() for index, hits in counts.items()),
+            key=lambda item: item[0],
+        )
+        await warm_ranges([
+            (paths[video_id], index * telemetry.bin_bytes, telemetry.bin_bytes)
+            for _, video_id, index in hottest
+        ])
+        return len(rows)
+
+    @staticmethod
+    async def heatmap(db: AsyncSession, video_id: uuid.UUID) -> list[tuple[int, int]]:
+        """``(bin, hits)`` for every bin of ``video_id`` that was ever served, in file order."""
+        rows = await db.execute(
+            select(VideoRangeBin.bin, VideoRangeBin.hits)
+            .where(VideoRangeBin.video_id == video_id)
+            .order_by(VideoRangeBin.bin)
+        )
+        return [(index, hits) for index, hits in rows.all()]
+
+
+async def flush_range_telemetry(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await RetentionService.flush()
+        except Exception:
+            logger.exception("Flushing range telemetry failed")
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal
+from app.models.session import Session
+from app.services.session_cache import get_session_cache
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "session_revoked"
+
+
+class RevocationFilter:
+    """Exact set of sessions revoked within the last access-token lifetime.
+
+    With ``AUTH_STATELESS_ACCESS`` an access token is trusted until it
+    expires unless its ``sid`` is in here. Tokens are never issued for a
+    revoked session, so an id can be dropped once every token issued before
+    the revocation has expired; the set stays as small as the number of
+    logouts per ``ACCESS_TOKEN_TTL_SECONDS``.
+    """
+
+    def __init__(self, retention: float) -> None:
+        self.retention = retention
+        self.ready = False
+        self._revoked: dict[uuid.UUID, float] = {}
+
+    def add(self, session_id: uuid.UUID) -> None:
+        self._revoked[session_id] = time.monotonic() + self.retention
+        metrics.set("auth_revoked_sessions", len(self._revoked))
+
+    def is_revoked(self, session_id: uuid.UUID) -> bool:
+        return session_id in self._revoked
+
+    def prune(self) -> None:
+        now = time.monotonic()
+        self._revoked = {sid: until for sid, until in self._revoked.items() if until > now}
+        metrics.set("auth_revoked_sessions", len(self._revoked))
+
+    async def rebuild(self) -> None:
+        """Reload the set from ``sessions.revoked_at``."""
+        since = datetime.now(UTC) - timedelta(seconds=self.retention)
+        async with AsyncSessionLocal() as db:
+            rows = (
+                await db.execute(select(Session.id, Session.revoked_at).where(Session.revoked_at > since))
+            ).all()
+        now = time.monotonic()
+        wall_now = datetime.now(UTC)
+        self._revoked = {
+            sid: now + self.retention - (wall_now - revoked_at).total_seconds() for sid, revoked_at in rows
+        }
+        self.ready = True
+        metrics.set("auth_revoked_sessions", len(self._revoked))
+
+
+_filter: RevocationFilter | None = None
+
+
+def get_revocation_filter() -> RevocationFilter:
+    global _filter
+    if _filter is None:
+        # A little slack for clock skew between workers and the database.
+        _filter = RevocationFilter(get_settings().access_token_ttl_seconds + 60)
+    return _filter
+
+
+def revoked_locally(session_id: uuid.UUID) -> None:
+    """Apply a revocation in this worker: drop the cached session and filter the id."""
+    get_session_cache().invalidate_session(session_id)
+    if get_settings().auth_stateless_access:
+        get_revocation_filter().add(session_id)
+
+
+async def publish_revocations(db: AsyncSession, session_ids: list[uuid.UUID]) -> None:
+    """Commit ``db``, which delivers the notifications to the other workers, then apply it here.
+
+    Applying it before the commit would let a concurrent request read the
+    still-valid row and cache it again for ``AUTH_CACHE_TTL_SECONDS``.
+    """
+    for session_id in session_ids:
+        # Postgres holds NOTIFY back until the transaction commits.
+        await db.execute(select(func.pg_notify(REVOCATION_CHANNEL, str(session_id))))
+    await db.commit()
+    for session_id in session_ids:
+        revoked_locally(session_id)
+
+
+def _on_notify(_connection, _pid: int, _channel: str, payload: str) -> None:
+    try:
+        session_id = uuid.UUID(payload)
+    except ValueError:
+        return
+    revoked_locally(session_id)
+    metrics.inc("auth_revocation_notifications_total")
+
+
+async def sync_revocations() -> None:
+    """LISTEN for revocations from other workers, rebuilding the filter on every (re)connect.
+
+    Notifications sent while disconnected are lost, hence the rebuild. Until
+    the first rebuild succeeds the filter is not ready and requests fall back
+    to checking the ``sessions`` table.
+    """
+    import asyncpg
+
+    revocations = get_revocation_filter()
+    dsn = make_url(get_settings().database_url).set(drivername="postgresql")
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn.render_as_string(hide_password=False))
+            await connection.add_listener(REVOCATION_CHANNEL, _on_notify)
+            await revocations.rebuild()
+            logger.info("Session revocation filter ready")
+            while not connection.is_closed():
+                await asyncio.sleep(min(60, revocations.retention))
+                revocations.prune()
+            revocations.ready = False
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            revocations.ready = False
+            logger.exception("Session revocation listener failed; reconnecting")
+            await asyncio.sleep(5)
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
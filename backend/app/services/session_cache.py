@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import inspect
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class _Entry:
+    token_hash: str
+    user_id: uuid.UUID
+    user: dict[str, Any]
+    expires_at: float
+
+
+class SessionCache:
+    """LRU of validated sessions, so authenticated requests skip the database.
+
+    Entries are keyed by session id and hold the session token hash they were
+    validated with plus a column snapshot of the user. Each request gets its
+    own transient ``User`` built from the snapshot, never a shared instance.
+    An entry lives ``ttl`` seconds at most, and never past the session's own
+    expiry. Revocation and profile changes invalidate it in this process;
+    other workers notice when the TTL runs out.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[uuid.UUID, _Entry] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, session_id: uuid.UUID, token_hash: str, user_id: uuid.UUID) -> User | None:
+        entry = self._entries.get(session_id)
+        if entry is None or entry.token_hash != token_hash or entry.user_id != user_id:
+            metrics.inc("auth_cache_misses_total")
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[session_id]
+            metrics.inc("auth_cache_misses_total")
+            return None
+        self._entries.move_to_end(session_id)
+        metrics.inc("auth_cache_hits_total")
+        return User(**entry.user)
+
+    def put(self, session_id: uuid.UUID, token_hash: str, user: User, session_expires_at: datetime) -> None:
+        if not self.enabled:
+            return
+        remaining = (session_expires_at - datetime.now(UTC)).total_seconds()
+        if remaining <= 0:
+            return
+        snapshot = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        self._entries[session_id] = _Entry(
+            token_hash=token_hash,
+            user_id=user.id,
+            user=snapshot,
+            expires_at=time.monotonic() + min(self.ttl, remaining),
+        )
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        metrics.set("auth_cache_entries", len(self._entries))
+
+    def invalidate_session(self, session_id: uuid.UUID) -> None:
+        self._entries.pop(session_id, None)
+
+    def invalidate_user(self, user_id: uuid.UUID) -> None:
+        for session_id in [sid for sid, entry in self._entries.items() if entry.user_id == user_id]:
+            del self._entries[session_id]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_cache: SessionCache | None = None
+
+
+def get_session_cache() -> SessionCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = SessionCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)
+    return _cache
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+
+from app.core.config import get_settings
+from app.core.errors import Conflict, Forbidden, NotFound, PayloadTooLarge
+from app.core.file_io import run_io
+from app.core.uploads import upload_slot
+
+
+@dataclass
+class UploadSession:
+    id: str
+    user_id: str
+    length: int
+    filename: str
+    created_at: float
+    offset: int = 0
+
+
+def _uploads_root() -> str:
+    # Kept outside media/, which is served publicly by the /media mount.
+    configured = get_settings().upload_sessions_dir
+    if configured:
+        return os.path.abspath(configured)
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "var", "uploads"))
+
+
+def _session_dir(upload_id: str) -> str:
+    return os.path.join(_uploads_root(), upload_id)
+
+
+def _data_path(upload_id: str) -> str:
+    return os.path.join(_session_dir(upload_id), "data.part")
+
+
+def _info_path(upload_id: str) -> str:
+    return os.path.join(_session_dir(upload_id), "info.json")
+
+
+def _write_session(session: UploadSession) -> None:
+    os.makedirs(_session_dir(session.id), exist_ok=True)
+    info = asdict(session)
+    info.pop("offset")
+    tmp_path = _info_path(session.id) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(tmp_path, _info_path(session.id))
+    open(_data_path(session.id), "ab").close()
+
+
+def _read_session(upload_id: str) -> UploadSession | None:
+    try:
+        with open(_info_path(upload_id), encoding="utf-8") as f:
+            info = json.load(f)
+        offset = os.path.getsize(_data_path(upload_id))
+    except (FileNotFoundError, ValueError):
+        return None
+    return UploadSession(offset=offset, **info)
+
+
+def _purge_expired(ttl_seconds: int) -> None:
+    root = _uploads_root()
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - ttl_seconds
+    for name in os.listdir(root):
+        session = _read_session(name)
+        created_at = session.created_at if session else os.path.getmtime(os.path.join(root, name))
+        if created_at < cutoff:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _try_lock(upload_id: str) -> int | None:
+    """Take an exclusive ``flock`` on the session's info file, or return None if it is held.
+
+    The lock is per open file description, so it serializes writers across
+    worker processes as well as within one.
+    """
+    fd = os.open(_info_path(upload_id), os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _unlock(fd: int) -> None:
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+@asynccontextmanager
+async def _session_lock(upload_id: str) -> AsyncIterator[None]:
+    try:
+        fd = await run_io(_try_lock, upload_id)
+    except FileNotFoundError as e:
+        raise NotFound("Upload not found") from e
+    if fd is None:
+        raise Conflict("Upload is in use by another request")
+    try:
+        yield
+    finally:
+        await run_io(_unlock, fd)
+
+
+class UploadService:
+    """Resumable (tus-style) uploads persisted under ``{upload_sessions_dir}/{id}``.
+
+    The byte offset of a session is the size of its ``data.part`` file, so
+    progress survives worker restarts.
+    """
+
+    @staticmethod
+    async def create(*, user_id: uuid.UUID, length: int, filename: str) -> UploadSession:
+        settings = get_settings()
+        if length < 0:
+            raise Conflict("Upload length must not be negative")
+        if length > settings.max_video_upload_bytes:
+            raise PayloadTooLarge(f"Upload exceeds {settings.max_video_upload_bytes} bytes")
+
+        await run_io(_purge_expired, settings.upload_session_ttl_seconds)
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=str(user_id),
+            length=length,
+            filename=os.path.basename(filename or ""),
+            created_at=time.time(),
+        )
+        await run_io(_write_session, session)
+        return session
+
+    @staticmethod
+    async def get(*, upload_id: str, user_id: uuid.UUID) -> UploadSession:
+        try:
+            upload_id = uuid.UUID(upload_id).hex
+        except ValueError as e:
+            raise NotFound("Upload not found") from e
+        session = await run_io(_read_session, upload_id)
+        if session is None:
+            raise NotFound("Upload not found")
+        if session.user_id != str(user_id):
+            raise Forbidden()
+        return session
+
+    @staticmethod
+    async def append(session: UploadSession, *, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """Append a request body at ``offset`` and return the new offset.
+
+        Bytes written before a dropped connection are kept, so the client can
+        query the offset and resume from there.
+        """
+        async with _session_lock(session.id), upload_slot():
+            try:
+                current = await run_io(os.path.getsize, _data_path(session.id))
+            except FileNotFoundError as e:
+                raise NotFound("Upload not found") from e
+            if offset != current:
+                raise Conflict(f"Upload-Offset {offset} does not match current offset {current}")
+            with await run_io(open, _data_path(session.id), "ab") as out:
+                async for chunk in chunks:
+                    if current + len(chunk) > session.length:
+                        raise PayloadTooLarge("Upload exceeds its declared length")
+                    await run_io(out.write, chunk)
+                    current += len(chunk)
+        session.offset = current
+        return current
+
+    @staticmethod
+    @asynccontextmanager
+    async def complete(session: UploadSession) -> AsyncIterator[str]:
+        """Lock the session and yield the path of the fully received file.
+
+        The caller moves the file out of the session inside the block; the
+        session is removed when the block exits without an error. A concurrent
+        finalize or abort gets a 409 while the lock is held, and a 404 after.
+        """
+        async with _session_lock(session.id):
+            try:
+                current = await run_io(os.path.getsize, _data_path(session.id))
+            except FileNotFoundError as e:
+                raise NotFound("Upload not found") from e
+            if current != session.length:
+                raise Conflict(f"Upload is incomplete ({current}/{session.length} bytes)")
+            yield _data_path(session.id)
+            await run_io(shutil.rmtree, _session_dir(session.id), True)
+
+    @staticmethod
+    async def abort(session: UploadSession) -> None:
+        try:
+            async with _session_lock(session.id):
+                await run_io(shutil.rmtree, _session_dir(session.id), True)
+        except NotFound:
+            pass
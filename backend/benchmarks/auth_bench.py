@@ -0,0 +1,128 @@
+"""Request latency with the old and the new shape of ``AuthContextMiddleware``.
+
+"before" is a ``BaseHTTPMiddleware`` that resolves the user eagerly on every
+request; "after" is the pure ASGI middleware with lazy loading in
+``get_request_user``. Both run in-process against the same small app with a
+signed-in user (served from the session cache, so no database is needed):
+
+    python -m benchmarks.auth_bench [--requests 2000] [--stream-mib 16]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import httpx
+from fastapi import Depends, FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.api.deps import get_request_user
+from app.core.config import get_settings
+from app.core.security import create_access_token, sha256_hex
+from app.core.streaming import StreamingResponseWithRange
+from app.middleware.auth import AuthContextMiddleware, AuthCookies, load_session_user
+from app.models.user import User
+from app.services.session_cache import get_session_cache
+
+
+class EagerAuthMiddleware(BaseHTTPMiddleware):
+    """The previous middleware: a ``BaseHTTPMiddleware`` resolving every request."""
+
+    async def dispatch(self, request: Request, call_next):
+        settings = get_settings()
+        request.state.user = None
+        request.state.session_id = None
+        access = request.cookies.get(settings.cookie_access_name)
+        session_token = request.cookies.get(settings.cookie_session_name)
+        if access and session_token:
+            loaded = await load_session_user(AuthCookies(access, session_token))
+            if loaded is not None:
+                request.state.user, request.state.session_id = loaded
+        request.state.user_id = request.state.user.id if request.state.user is not None else None
+        return await call_next(request)
+
+
+def build(middleware: type, video_path: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/healthz")
+    async def healthz() -> dict:
+        return {"status": "ok"}
+
+    @app.get("/me")
+    async def me(user: User | None = Depends(get_request_user)) -> dict:
+        return {"username": user.username if user else None}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponseWithRange(video_path)
+
+    app.add_middleware(middleware)
+    return app
+
+
+def sign_in() -> dict[str, str]:
+    """Cookies of a session that the session cache already knows."""
+    settings = get_settings()
+    user = User(id=uuid.uuid4(), email="bench@example.com", password_hash="", username="bench", is_active=True)
+    session_id = uuid.uuid4()
+    session_token = uuid.uuid4().hex
+    get_session_cache().put(session_id, sha256_hex(session_token), user, datetime.now(UTC) + timedelta(days=1))
+    return {
+        settings.cookie_access_name: create_access_token(user_id=user.id, session_id=session_id),
+        settings.cookie_session_name: session_token,
+    }
+
+
+async def measure(app: FastAPI, path: str, cookies: dict[str, str], requests: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookies) as client:
+        for _ in range(min(50, requests)):
+            await client.get(path)
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get(path)
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+    return samples
+
+
+def report(label: str, samples: list[float]) -> str:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    return (f"{label:<8} mean {statistics.mean(samples) * 1e6:9.1f}us  "
+            f"p50 {statistics.median(samples) * 1e6:9.1f}us  p99 {p99 * 1e6:9.1f}us")
+
+
+async def run(requests: int, stream_mib: int) -> None:
+    cookies = sign_in()
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as f:
+        f.write(os.urandom(1024 * 1024) * stream_mib)
+    try:
+        apps = {"before": build(EagerAuthMiddleware, f.name), "after": build(AuthContextMiddleware, f.name)}
+        for path, count in (("/healthz", requests), ("/me", requests), ("/stream", max(1, requests // 20))):
+            print(f"GET {path} x{count}")
+            for label, app in apps.items():
+                print("  " + report(label, await measure(app, path, cookies, count)))
+    finally:
+        os.unlink(f.name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--stream-mib", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.stream_mib))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compare the chunked and zero-copy body paths of StreamingResponseWithRange.
+
+Drives the response directly as an ASGI app against two in-process fake
+servers: one that only understands ``http.response.body`` and one that
+advertises ``http.response.zerocopysend`` and fulfils it with os.sendfile.
+Bytes are written to /dev/null so the numbers reflect the app side only.
+
+Usage:
+    python -m benchmarks.streaming_bench [--size-mb 256] [--streams 8]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.core.streaming import StreamingResponseWithRange
+
+
+class _Sink:
+    def __init__(self, zero_copy: bool) -> None:
+        self.zero_copy = zero_copy
+        self.fd = os.open(os.devnull, os.O_WRONLY)
+        self.bytes = 0
+
+    def scope(self, range_header: str | None) -> dict:
+        headers = [(b"range", range_header.encode())] if range_header else []
+        extensions = {"http.response.zerocopysend": {}} if self.zero_copy else {}
+        return {"type": "http", "method": "GET", "path": "/", "headers": headers, "extensions": extensions}
+
+    async def receive(self) -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(self, message: dict) -> None:
+        if message["type"] == "http.response.body":
+            self.bytes += os.write(self.fd, message["body"]) if message["body"] else 0
+        elif message["type"] == "http.response.zerocopysend":
+            offset, remaining = message["offset"], message["count"]
+            fileno = message["file"].fileno()
+            while remaining > 0:
+                n = os.sendfile(self.fd, fileno, offset, remaining)
+                if n == 0:
+                    break
+                offset += n
+                remaining -= n
+                self.bytes += n
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+async def _run(path: str, zero_copy: bool, streams: int, range_header: str | None) -> tuple[int, float, float]:
+    sink = _Sink(zero_copy)
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(streams):
+        response = StreamingResponseWithRange(path, zero_copy=zero_copy)
+        await response(sink.scope(range_header), sink.receive, sink.send)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    sink.close()
+    return sink.bytes, wall, cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--streams", type=int, default=8)
+    parser.add_argument("--range", dest="range_header", default=None, help='e.g. "bytes=1048576-"')
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(args.size_mb):
+            f.write(block)
+        path = f.name
+
+    try:
+        print(f"{'mode':<10} {'MB/s':>10} {'cpu ms/stream':>15}")
+        for label, zero_copy in (("chunked", False), ("zerocopy", True)):
+            total, wall, cpu = asyncio.run(_run(path, zero_copy, args.streams, args.range_header))
+            print(f"{label:<10} {total / wall / 1e6:>10.1f} {cpu * 1000 / args.streams:>15.2f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
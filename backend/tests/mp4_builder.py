@@ -0,0 +1,125 @@
+"""Builds small, valid MP4 files in memory for the MP4 and HLS tests."""
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+
+SPS = b"\x67\x42\xc0\x1e\x95\xa0"
+PPS = b"\x68\xce\x3c\x80"
+AAC_CONFIG = bytes([0x12, 0x10])  # AAC LC, 44.1 kHz, stereo
+
+
+def box(box_type: bytes, body: bytes) -> bytes:
+    return struct.pack(">I4s", len(body) + 8, box_type) + body
+
+
+def full_box(box_type: bytes, body: bytes, version: int = 0, flags: int = 0) -> bytes:
+    return box(box_type, struct.pack(">I", (version << 24) | flags) + body)
+
+
+def avcc(sps: bytes = SPS, pps: bytes = PPS) -> bytes:
+    return box(b"avcC", bytes([1, 0x42, 0xC0, 0x1E, 0xFF, 0xE1]) + struct.pack(">H", len(sps)) + sps
+               + b"\x01" + struct.pack(">H", len(pps)) + pps)
+
+
+def esds(config: bytes = AAC_CONFIG) -> bytes:
+    specific = bytes([0x05, len(config)]) + config
+    decoder = bytes([0x04, 13 + len(specific), 0x40, 0x15]) + b"\x00" * 11 + specific
+    es = bytes([0x03, 3 + len(decoder)]) + b"\x00\x01\x00" + decoder
+    return full_box(b"esds", es)
+
+
+def video_sample(index: int, keyframe: bool, size: int = 40) -> bytes:
+    """One AVCC-framed IDR or non-IDR NAL whose bytes identify the sample."""
+    nal = bytes([0x65 if keyframe else 0x41]) + bytes((index + i) & 0xFF for i in range(size - 1))
+    return struct.pack(">I", len(nal)) + nal
+
+
+def audio_sample(index: int, size: int = 24) -> bytes:
+    return bytes((0x80 + index + i) & 0xFF for i in range(size))
+
+
+@dataclass
+class Track:
+    handler: bytes
+    samples: list[bytes]
+    timescale: int
+    delta: int
+    entry: bytes
+    keyframes: list[int] | None = None
+    offsets: list[int] = field(default_factory=list)
+
+
+def video_track(count: int, keyframes: list[int], timescale: int = 30, avc_config: bytes | None = None) -> Track:
+    samples = [video_sample(n, n in keyframes) for n in range(count)]
+    # Reserved, data reference index, then 70 bytes of visual sample entry fields.
+    fields = b"\x00" * 6 + b"\x00\x01" + b"\x00" * 16 + struct.pack(">HH", 320, 240) + b"\x00" * 50
+    entry = box(b"avc1", fields + (avcc() if avc_config is None else avc_config))
+    return Track(b"vide", samples, timescale, 1, entry, keyframes)
+
+
+def audio_track(count: int, timescale: int = 44100) -> Track:
+    fields = b"\x00" * 6 + b"\x00\x01" + b"\x00" * 8 + struct.pack(">HHHHI", 2, 16, 0, 0, timescale << 16)
+    entry = box(b"mp4a", fields + esds())
+    return Track(b"soun", [audio_sample(n) for n in range(count)], timescale, 1024, entry)
+
+
+def _trak(track_id: int, track: Track, co64: bool) -> bytes:
+    count = len(track.samples)
+    tkhd = full_box(b"tkhd", struct.pack(">IIII", 0, 0, track_id, 0) + b"\x00" * 56
+                    + struct.pack(">II", 320 << 16, 240 << 16))
+    mdhd = full_box(b"mdhd", struct.pack(">IIIIHH", 0, 0, track.timescale, count * track.delta, 0, 0))
+    hdlr = full_box(b"hdlr", b"\x00" * 4 + track.handler + b"\x00" * 13)
+    offsets = track.offsets or [0] * count
+    stbl = box(b"stbl", b"".join([
+        full_box(b"stsd", struct.pack(">I", 1) + track.entry),
+        full_box(b"stts", struct.pack(">III", 1, count, track.delta)),
+        full_box(b"stss", struct.pack(f">I{len(track.keyframes)}I", len(track.keyframes),
+                                      *(n + 1 for n in track.keyframes)))
+        if track.keyframes is not None else b"",
+        full_box(b"stsc", struct.pack(">IIII", 1, 1, 1, 1)),
+        full_box(b"stsz", struct.pack(f">II{count}I", 0, count, *map(len, track.samples))),
+        full_box(b"co64" if co64 else b"stco",
+                 struct.pack(f">I{count}{'Q' if co64 else 'I'}", count, *offsets)),
+    ]))
+    return box(b"trak", tkhd + box(b"mdia", mdhd + hdlr + box(b"minf", stbl)))
+
+
+def _moov(tracks: list[Track], co64: bool) -> bytes:
+    duration = max(len(t.samples) * t.delta / t.timescale for t in tracks)
+    mvhd = full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, int(duration * 1000)) + b"\x00" * 80)
+    return box(b"moov", mvhd + b"".join(_trak(i + 1, t, co64) for i, t in enumerate(tracks)))
+
+
+def build_mp4(tracks: list[Track], layout: str = "moov_last", co64: bool = False) -> bytes:
+    """An MP4 with one sample per chunk, in one of these top-level layouts.
+
+    ``moov_last``: ftyp mdat moov. ``split``: ftyp free mdat moov mdat, with
+    the second half of every track's samples in the trailing mdat.
+    ``faststart``: ftyp moov mdat.
+    """
+    ftyp = box(b"ftyp", b"isom\x00\x00\x02\x00isomavc1")
+    moov_size = len(_moov(tracks, co64))
+    first = [(t, n) for t in tracks for n in range(len(t.samples))]
+    second: list[tuple[Track, int]] = []
+    if layout == "split":
+        first = [(t, n) for t in tracks for n in range(len(t.samples) // 2)]
+        second = [(t, n) for t in tracks for n in range(len(t.samples) // 2, len(t.samples))]
+
+    for track in tracks:
+        track.offsets = [0] * len(track.samples)
+    head = ftyp + (box(b"free", b"\x00" * 8) if layout == "split" else b"")
+    pos = len(head) + (moov_size if layout == "faststart" else 0) + 8
+    for part in (first, second):
+        for track, n in part:
+            track.offsets[n] = pos
+            pos += len(track.samples[n])
+        if layout != "faststart":
+            pos += moov_size if part is first else 0
+        pos += 8
+
+    mdats = [box(b"mdat", b"".join(t.samples[n] for t, n in part)) for part in (first, second) if part]
+    moov = _moov(tracks, co64)
+    if layout == "faststart":
+        return head + moov + b"".join(mdats)
+    return head + mdats[0] + moov + b"".join(mdats[1:])
@@ -0,0 +1,102 @@
+import pytest
+
+from app.core.hls import (
+    AUDIO_PID,
+    PAT_PID,
+    PLAYLIST_NAME,
+    PMT_PID,
+    START_CODE,
+    TS_PACKET_SIZE,
+    VIDEO_PID,
+    _adts_header,
+    _cut_points,
+    _Stream,
+    package_hls,
+)
+from app.core.mp4 import Mp4Error
+from mp4_builder import audio_track, box, build_mp4, video_track
+
+KEYFRAMES = [0, 15, 25, 35]
+
+
+def test_truncated_avcc_is_reported_as_mp4_error(tmp_path):
+    truncated = box(b"avcC", bytes([1, 0x42, 0xC0, 0x1E, 0xFF, 0xE1, 0x00]))
+    src = tmp_path / "video.mp4"
+    src.write_bytes(build_mp4([video_track(30, [0], avc_config=truncated)], "faststart"))
+
+    with pytest.raises(Mp4Error):
+        package_hls(str(src), str(tmp_path / "hls"), 1.0)
+    assert not (tmp_path / "hls").exists()
+
+
+def _packets(data):
+    assert len(data) % TS_PACKET_SIZE == 0
+    for pos in range(0, len(data), TS_PACKET_SIZE):
+        packet = data[pos:pos + TS_PACKET_SIZE]
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        has_adaptation = bool(packet[3] & 0x20)
+        adaptation = packet[5:5 + packet[4]] if has_adaptation else b""
+        payload = packet[5 + packet[4]:] if has_adaptation else packet[4:]
+        yield packet, pid, bool(packet[1] & 0x40), packet[3] & 0x0F, adaptation, payload
+
+
+@pytest.fixture
+def segments(tmp_path):
+    src = tmp_path / "video.mp4"
+    src.write_bytes(build_mp4([video_track(45, KEYFRAMES), audio_track(60)], "faststart"))
+    out_dir = tmp_path / "hls"
+    count = package_hls(str(src), str(out_dir), 0.4)
+    playlist = (out_dir / PLAYLIST_NAME).read_text().splitlines()
+    names = [line for line in playlist if line.endswith(".ts")]
+    assert len(names) == count
+    return [(out_dir / name).read_bytes() for name in names]
+
+
+def test_segments_are_whole_ts_packets(segments):
+    for data in segments:
+        for packet, *_ in _packets(data):
+            assert len(packet) == TS_PACKET_SIZE
+            assert packet[0] == 0x47
+
+
+def test_continuity_counters_increment_per_pid(segments):
+    last: dict[int, int] = {}
+    for data in segments:
+        for _, pid, _, continuity, _, _ in _packets(data):
+            if pid in last:
+                assert continuity == (last[pid] + 1) & 0x0F
+            last[pid] = continuity
+    assert {PAT_PID, PMT_PID, VIDEO_PID, AUDIO_PID} <= last.keys()
+
+
+def test_segments_start_on_keyframes(segments):
+    # 0.4 s segments at 30 fps cut at the first keyframe 0.4 s after the last cut.
+    assert len(segments) == 3
+    for data in segments:
+        video = [(pusi, adaptation, payload) for _, pid, pusi, _, adaptation, payload in _packets(data)
+                 if pid == VIDEO_PID]
+        pusi, adaptation, first_pes = video[0]
+        assert pusi and adaptation[0] & 0x40
+        for pusi, _, payload in video[1:]:
+            if pusi:
+                break
+            first_pes += payload
+        assert START_CODE + b"\x65" in first_pes
+
+
+def test_cut_points_are_keyframes():
+    stream = _Stream(pid=VIDEO_PID, stream_id=0xE0, timescale=30, times=list(range(45)),
+                     cts=[0] * 45, offsets=[0] * 45, sizes=[1] * 45, keyframes=set(KEYFRAMES))
+    assert _cut_points(stream, 0.4) == [0, 15, 35]
+    assert _cut_points(stream, 10) == [0]
+
+
+@pytest.mark.parametrize("frame_length", [0, 1, 371, 2048, 8184])
+def test_adts_frame_length_includes_the_header(frame_length):
+    header = _adts_header((1, 4, 2), frame_length)
+    assert len(header) == 7
+    assert header[0] == 0xFF and header[1] & 0xF0 == 0xF0
+    length = ((header[3] & 0x03) << 11) | (header[4] << 3) | (header[5] >> 5)
+    assert length == frame_length + 7
+    assert header[2] >> 6 == 1 and (header[2] >> 2) & 0x0F == 4
+    assert ((header[2] & 0x01) << 2) | (header[3] >> 6) == 2
@@ -0,0 +1,32 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.core import config
+from app.core.security import verify_media_signature
+from app.services.image_variants import variant_url
+
+
+@pytest.fixture
+def signed_urls(monkeypatch):
+    monkeypatch.setenv("MEDIA_SIGNED_URLS", "true")
+    monkeypatch.setattr(config, "_settings", None)
+    yield
+    monkeypatch.setattr(config, "_settings", None)
+
+
+def test_versioned_variant_url_is_signed_over_its_path(signed_urls):
+    url = variant_url("/media/thumbnails/ab/cd/abcd.jpg?v=123&exp=1&sig=old", 320, "webp")
+
+    parts = urlsplit(url)
+    params = parse_qs(parts.query)
+    assert parts.path == "/media/variants/thumbnails/ab/cd/abcd.jpg/320.webp"
+    assert params["v"] == ["123"]
+    assert params["sig"] != ["old"]
+    assert verify_media_signature(parts.path, params["exp"][0], params["sig"][0])
+
+
+def test_public_variant_urls_are_not_signed(signed_urls):
+    url = variant_url("/media/avatars/user.png?v=123", 160, "webp")
+
+    assert url == "/media/variants/avatars/user.png/160.webp?v=123"
@@ -0,0 +1,57 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.api.media import MediaCacheHeaders
+from app.core import config
+from app.core.offload import media_static_files
+from tools.offload_proxy import OffloadProxy
+
+DATA = bytes(n % 256 for n in range(4096))
+
+
+@pytest.fixture(params=["x-accel-redirect", "x-sendfile"])
+def client(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_OFFLOAD", request.param)
+    monkeypatch.setattr(config, "_settings", None)
+    (tmp_path / "avatars").mkdir()
+    (tmp_path / "avatars" / "user.png").write_bytes(DATA)
+    app = Starlette(routes=[Mount("/media", MediaCacheHeaders(media_static_files(str(tmp_path))))])
+    proxy = OffloadProxy(app, str(tmp_path), config.get_settings().media_offload_prefix)
+    with TestClient(proxy) as client:
+        yield client, request.param
+    monkeypatch.setattr(config, "_settings", None)
+
+
+def test_offloaded_file_resolves_to_its_bytes(client):
+    client, mode = client
+    response = client.get("/media/avatars/user.png")
+
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["content-type"] == "image/png"
+    offloaded_from = response.headers["x-offloaded-from"]
+    if mode == "x-accel-redirect":
+        assert offloaded_from == "/internal-media/avatars/user.png"
+    else:
+        assert offloaded_from.endswith("/avatars/user.png")
+
+
+def test_offloaded_file_honours_range(client):
+    client, _ = client
+    response = client.get("/media/avatars/user.png", headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{len(DATA)}"
+    assert response.content == DATA[100:200]
+
+
+def test_offloaded_file_revalidates_with_304(client):
+    client, _ = client
+    etag = client.get("/media/avatars/user.png").headers["etag"]
+    response = client.get("/media/avatars/user.png?v=1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert "immutable" in response.headers["cache-control"]
@@ -0,0 +1,144 @@
+import re
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.streaming import (
+    MAX_RANGES,
+    RangeNotSatisfiable,
+    StreamingResponseWithRange,
+    if_range_matches,
+    parse_range_header,
+)
+
+FILE_SIZE = 1000
+ETAG = '"abc"'
+LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("bytes=0-99", [(0, 99)]),
+        ("bytes=900-", [(900, 999)]),
+        ("bytes=-100", [(900, 999)]),
+        ("bytes=-5000", [(0, 999)]),
+        ("bytes=990-2000", [(990, 999)]),
+        ("BYTES = 0-0", [(0, 0)]),
+        ("bytes=0-99, 50-149", [(0, 149)]),
+        ("bytes=100-199,0-99", [(0, 199)]),
+        ("bytes=0-9,20-29", [(0, 9), (20, 29)]),
+        ("bytes=500-599,0-9,-10", [(0, 9), (500, 599), (990, 999)]),
+        ("bytes=0-9,-0", [(0, 9)]),
+        ("bytes=2000-,0-9", [(0, 9)]),
+    ],
+)
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, FILE_SIZE) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "bytes=1000-",
+        "bytes=1000-1200",
+        "bytes=-0",
+        "bytes=1000-,2000-2999",
+    ],
+)
+def test_unsatisfiable_range_sets(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, FILE_SIZE)
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "items=0-9",
+        "bytes=",
+        "bytes=-",
+        "bytes=abc",
+        "bytes=9-0",
+        "bytes=0-9,,20-29",
+        "bytes=0-9;20-29",
+        "bytes=" + ",".join(f"{n}-{n}" for n in range(MAX_RANGES + 1)),
+    ],
+)
+def test_malformed_range_headers_are_ignored(header):
+    assert parse_range_header(header, FILE_SIZE) is None
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, True),
+        (ETAG, True),
+        ('"other"', False),
+        (f"W/{ETAG}", False),
+        (LAST_MODIFIED, True),
+        ("Thu, 22 Oct 2015 07:28:00 GMT", False),
+    ],
+)
+def test_if_range(header, expected):
+    assert if_range_matches(header, ETAG, LAST_MODIFIED) is expected
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(n % 251 for n in range(FILE_SIZE)))
+
+    async def stream(request):
+        return StreamingResponseWithRange(str(path))
+
+    with TestClient(Starlette(routes=[Route("/video", stream)])) as client:
+        yield client, path.read_bytes()
+
+
+def test_multipart_byteranges_framing(client):
+    client, data = client
+    response = client.get("/video", headers={"Range": "bytes=0-9,500-519,-5"})
+
+    assert response.status_code == 206
+    boundary = re.fullmatch(r"multipart/byteranges; boundary=(\w+)", response.headers["content-type"]).group(1)
+    body = response.content
+    assert int(response.headers["content-length"]) == len(body)
+    assert body.startswith(f"--{boundary}\r\n".encode())
+    assert body.endswith(f"\r\n--{boundary}--\r\n".encode())
+
+    parts = body[:-len(f"\r\n--{boundary}--\r\n")].split(f"--{boundary}\r\n".encode())[1:]
+    assert len(parts) == 3
+    for part, (start, end) in zip(parts, [(0, 9), (500, 519), (995, 999)]):
+        head, _, payload = part.partition(b"\r\n\r\n")
+        assert f"Content-Range: bytes {start}-{end}/{FILE_SIZE}".encode() in head
+        assert b"Content-Type: video/mp4" in head
+        assert payload.removesuffix(b"\r\n") == data[start:end + 1]
+
+
+def test_if_range_mismatch_sends_the_whole_file(client):
+    client, data = client
+    response = client.get("/video", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.content == data
+
+
+def test_if_range_match_and_if_none_match(client):
+    client, data = client
+    etag = client.get("/video").headers["etag"]
+
+    ranged = client.get("/video", headers={"Range": "bytes=10-19", "If-Range": etag})
+    assert ranged.status_code == 206
+    assert ranged.headers["content-range"] == f"bytes 10-19/{FILE_SIZE}"
+    assert ranged.content == data[10:20]
+    assert client.get("/video", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+
+def test_unsatisfiable_range_is_416(client):
+    client, _ = client
+    response = client.get("/video", headers={"Range": f"bytes={FILE_SIZE}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{FILE_SIZE}"
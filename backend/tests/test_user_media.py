@@ -0,0 +1,21 @@
+import uuid
+
+from app.api import media
+from app.api.media import UserMediaIndex, remove_other_user_media
+
+
+def test_upload_with_new_extension_survives_a_rescan(tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "_media_root", lambda: str(tmp_path))
+    (tmp_path / "avatars").mkdir()
+    user_id = uuid.uuid4()
+    for ext in (".png", ".jpg", ".webp"):
+        (tmp_path / "avatars" / f"{user_id}{ext}").write_bytes(b"x")
+
+    removed = remove_other_user_media("avatars", user_id, f"{user_id}.webp")
+    index = UserMediaIndex()
+    index.rebuild()
+
+    assert sorted(removed) == [f"/media/avatars/{user_id}.jpg", f"/media/avatars/{user_id}.png"]
+    assert index.lookup(user_id, "avatars") == f"/media/avatars/{user_id}.webp"
+    index.rescan_user("avatars", user_id)
+    assert index.lookup(user_id, "avatars") == f"/media/avatars/{user_id}.webp"
@@ -0,0 +1,106 @@
+"""Stand-in for nginx when checking ``MEDIA_OFFLOAD`` locally.
+
+Wraps the app like the fronting proxy would: responses carrying
+``X-Accel-Redirect`` (mapped from ``MEDIA_OFFLOAD_PREFIX`` to ``media/``) or
+``X-Sendfile`` are replaced by the file itself, with Range support.
+``tests/test_offload.py`` runs the media mount behind it.
+
+    MEDIA_OFFLOAD=x-accel-redirect python -m tools.offload_proxy /media/avatars/<file>
+    MEDIA_OFFLOAD=x-accel-redirect python -m tools.offload_proxy --serve [--port 8080]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from urllib.parse import unquote
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class OffloadProxy:
+    def __init__(self, app: ASGIApp, media_dir: str, internal_prefix: str) -> None:
+        self.app = app
+        self.media_dir = os.path.abspath(media_dir)
+        self.internal_prefix = internal_prefix.rstrip("/") + "/"
+
+    def _target(self, headers: Headers) -> str | None:
+        if "x-sendfile" in headers:
+            return headers["x-sendfile"]
+        redirect = headers.get("x-accel-redirect")
+        if redirect is None:
+            return None
+        redirect = unquote(redirect)
+        if not redirect.startswith(self.internal_prefix):
+            return ""
+        path = os.path.abspath(os.path.join(self.media_dir, redirect[len(self.internal_prefix):]))
+        return path if os.path.commonpath([self.media_dir, path]) == self.media_dir else ""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        target: str | None = None
+
+        async def intercept(message: Message) -> None:
+            nonlocal start, target
+            if message["type"] == "http.response.start":
+                target = self._target(Headers(raw=message["headers"]))
+                if target is None:
+                    await send(message)
+                else:
+                    start = message
+            elif target is None:
+                await send(message)
+
+        await self.app(scope, receive, intercept)
+        if start is None:
+            return
+        if not target or not os.path.isfile(target):
+            await PlainTextResponse("offload target not found", status_code=404)(scope, receive, send)
+            return
+        upstream = Headers(raw=start["headers"])
+        headers = {"X-Offloaded-From": upstream.get("x-accel-redirect") or upstream["x-sendfile"]}
+        if "x-accel-limit-rate" in upstream:
+            headers["X-Accel-Limit-Rate"] = upstream["x-accel-limit-rate"]
+        await FileResponse(target, headers=headers, media_type=upstream.get("content-type"))(scope, receive, send)
+
+
+def build(app: ASGIApp | None = None) -> OffloadProxy:
+    from app.core.config import get_settings
+    from app.main import app as default_app
+
+    media_dir = os.path.join(os.path.dirname(__file__), "..", "media")
+    return OffloadProxy(app or default_app, media_dir, get_settings().media_offload_prefix)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", help="request this path through the proxy and print the headers")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+
+        uvicorn.run(build(), port=args.port)
+        return
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    for label, client in (("app", TestClient(app)), ("proxy", TestClient(build(app)))):
+        response = client.get(args.path or "/healthz")
+        print(f"{label}: {response.status_code} {len(response.content)} bytes")
+        for key, value in response.headers.items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import React, { memo } from 'react';
 import { Link } from 'react-router-dom';
 import { Video } from '../types';
 import { CheckCircle } from 'lucide-react';
-import { resolveMediaUrl } from '../utils/media';
+import { resolveMediaUrl, resolveSrcSet } from '../utils/media';
 
 interface VideoCardProps {
   video: Video;
@@ -16,12 +16,17 @@ const VideoCard: React.FC<VideoCardProps> = ({ video, layout = 'grid' }) => {
       <Link to={`/watch/${video.id}`} className="flex gap-4 group mb-4 w-full">
         <div className="relative w-40 min-w-[160px] aspect-video rounded-xl overflow-hidden bg-gray-200">
           {thumbSrc ? (
-            <img
-              src={thumbSrc}
-              alt={video.title}
-              loading="lazy"
-              className="object-cover w-full h-full group-hover:scale-105 transition-transform duration-200"
-            />
+            <picture>
+              <source type="image/webp" srcSet={resolveSrcSet(video.thumbnailSrcset?.webp)} sizes="160px" />
+              <img
+                src={thumbSrc}
+                srcSet={resolveSrcSet(video.thumbnailSrcset?.jpg)}
+                sizes="160px"
+                alt={video.title}
+                loading="lazy"
+                className="object-cover w-full h-full group-hover:scale-105 transition-transform duration-200"
+              />
+            </picture>
           ) : null}
           <span className="absolute bottom-1 right-1 bg-black/80 text-white text-xs px-1 rounded">
             {video.duration}
@@ -48,12 +53,21 @@ const VideoCard: React.FC<VideoCardProps> = ({ video, layout = 'grid' }) => {
     <Link to={`/watch/${video.id}`} className="group flex flex-col gap-3">
       <div className="relative aspect-video rounded-xl overflow-hidden bg-gray-200">
         {thumbSrc ? (
-          <img
-            src={thumbSrc}
-            alt={video.title}
-            loading="lazy"
-            className="object-cover w-full h-full group-hover:scale-105 transition-transform duration-200"
-          />
+          <picture>
+            <source
+              type="image/webp"
+              srcSet={resolveSrcSet(video.thumbnailSrcset?.webp)}
+              sizes="(min-width: 1024px) 320px, 100vw"
+            />
+            <img
+              src={thumbSrc}
+              srcSet={resolveSrcSet(video.thumbnailSrcset?.jpg)}
+              sizes="(min-width: 1024px) 320px, 100vw"
+              alt={video.title}
+              loading="lazy"
+              className="object-cover w-full h-full group-hover:scale-105 transition-transform duration-200"
+            />
+          </picture>
         ) : null}
         <span className="absolute bottom-1 right-1 bg-black/80 text-white text-xs px-1 rounded">
           {video.duration}
@@ -62,6 +76,8 @@ const VideoCard: React.FC<VideoCardProps> = ({ video, layout = 'grid' }) => {
       <div className="flex gap-3 items-start">
         <img
           src={resolveMediaUrl(video.uploader.avatar)}
+          srcSet={resolveSrcSet(video.uploader.avatarSrcset?.webp)}
+          sizes="36px"
           alt={video.uploader.username}
           loading="lazy"
           className="w-9 h-9 rounded-full object-cover"
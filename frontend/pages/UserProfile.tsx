@@ -4,7 +4,7 @@ import { Video, User } from '../types';
 import { useAuth } from '../context/AuthContext';
 import VideoCard from '../components/VideoCard';
 import { subscriptionAPI, userAPI, videoAPI } from '../api';
-import { resolveMediaUrl } from '../utils/media';
+import { resolveMediaUrl, resolveSrcSet } from '../utils/media';
 
 const UserProfile: React.FC = () => {
   const { id } = useParams<{ id: string }>();
@@ -93,7 +93,16 @@ const UserProfile: React.FC = () => {
       <div className="bg-white rounded-xl overflow-hidden border border-gray-200 shadow-sm">
         <div className="h-32 md:h-48 bg-gradient-to-r from-slate-800 to-slate-600 relative">
           {profile?.banner ? (
-            <img src={resolveMediaUrl(profile.banner)} alt="Banner" className="absolute inset-0 w-full h-full object-cover" />
+            <picture>
+              <source type="image/webp" srcSet={resolveSrcSet(profile.bannerSrcset?.webp)} sizes="(min-width: 1152px) 1152px, 100vw" />
+              <img
+                src={resolveMediaUrl(profile.banner)}
+                srcSet={resolveSrcSet(profile.bannerSrcset?.jpg)}
+                sizes="(min-width: 1152px) 1152px, 100vw"
+                alt="Banner"
+                className="absolute inset-0 w-full h-full object-cover"
+              />
+            </picture>
           ) : null}
         </div>
         <div className="px-6 pb-6">
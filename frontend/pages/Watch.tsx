@@ -3,7 +3,7 @@ import { Link, useParams } from 'react-router-dom';
 import { ThumbsUp, ThumbsDown, Share2, MoreHorizontal, User as UserIcon } from 'lucide-react';
 import { Video, Comment } from '../types';
 import { useAuth } from '../context/AuthContext';
-import { resolveMediaUrl } from '../utils/media';
+import { resolveMediaUrl, resolveVideoStreamUrl } from '../utils/media';
 
 import { videoAPI, commentAPI, subscriptionAPI } from '../api';
 
@@ -478,7 +478,7 @@ const Watch: React.FC = () => {
       <div className="flex-1">
         <div className="w-full aspect-video bg-black rounded-xl overflow-hidden shadow-lg relative group">
           <video
-            src={resolveMediaUrl(video.url)}
+            src={resolveVideoStreamUrl(video.id, video.url, video.streamUrl)}
             className="w-full h-full object-contain"
             controls
             autoPlay
@@ -2,7 +2,9 @@ export interface User {
   id: string;
   username: string;
   avatar: string;
+  avatarSrcset?: Record<string, string>;
   banner?: string;
+  bannerSrcset?: Record<string, string>;
   subscribers: number;
 }
 
@@ -22,7 +24,9 @@ export interface Video {
   title: string;
   description: string;
   thumbnail: string;
+  thumbnailSrcset?: Record<string, string>;
   url: string;
+  streamUrl?: string | null;
   views: number;
   likes: number;
   dislikes: number;
@@ -6,3 +6,22 @@ export const resolveMediaUrl = (url?: string | null): string => {
   if (url.startsWith('/media/')) return `${BACKEND_BASE_URL}${url}`;
   return url;
 };
+
+// Resolves each URL of a "url 320w, url 640w" srcset like resolveMediaUrl.
+export const resolveSrcSet = (srcset?: string | null): string | undefined => {
+  if (!srcset) return undefined;
+  return srcset
+    .split(', ')
+    .map((candidate) => {
+      const [url, width] = candidate.split(' ');
+      return `${resolveMediaUrl(url)} ${width}`;
+    })
+    .join(', ');
+};
+
+export const resolveVideoStreamUrl = (videoId: string, url?: string | null, streamUrl?: string | null): string => {
+  if (!url) return '';
+  // streamUrl carries exp/sig when media URLs are signed.
+  if (url.startsWith('/media/')) return `${BACKEND_BASE_URL}${streamUrl || `/api/v1/videos/${videoId}/stream`}`;
+  return resolveMediaUrl(url);
+};